@@ -0,0 +1,99 @@
+"""
+Password hashing under concurrent sign-ins.
+
+Simulates `--logins` sign-ins arriving at once from `--concurrency` sessions, each
+verifying a bcrypt hash, and reports hashes/second, p50/p99 login latency, and how
+late a 10 ms timer in an unrelated "session" thread fires meanwhile (a proxy for how
+much the burst stalls everyone else). Runs both the old inline bcrypt calls and the
+shared hashing pool:
+
+    python benchmarks/hashing_load.py --rounds 12 --concurrency 16 --logins 64
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.hashing import Hasher, DEFAULT_WORKERS, DEFAULT_MAX_PENDING  # noqa: E402
+
+PASSWORD = "correct horse battery staple"
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def timer_lag(stop, lags, period=0.01):
+    """Record how late a `period` sleep wakes up until `stop` is set."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        time.sleep(period)
+        lags.append(time.perf_counter() - start - period)
+
+
+def run(verify, hashed, concurrency, logins):
+    latencies = []
+
+    def login():
+        start = time.perf_counter()
+        assert verify(PASSWORD, hashed)
+        latencies.append(time.perf_counter() - start)
+
+    stop, lags = threading.Event(), []
+    probe = threading.Thread(target=timer_lag, args=(stop, lags), daemon=True)
+    probe.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as sessions:
+        for _ in range(logins):
+            sessions.submit(login)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    probe.join()
+    return {
+        "hashes_per_s": logins / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "timer_lag_p99_ms": percentile(lags, 99) * 1000 if lags else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--concurrency", type=int, default=16, help="sessions signing in at once")
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    hashed = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(args.rounds)).decode("utf-8")
+    inline = lambda plain, stored: bcrypt.checkpw(plain.encode("utf-8"), stored.encode("utf-8"))  # noqa: E731
+    hasher = Hasher(rounds=args.rounds, workers=args.workers,
+                    max_pending=max(DEFAULT_MAX_PENDING, args.concurrency), queue_timeout=600)
+
+    results = {
+        "inline": run(inline, hashed, args.concurrency, args.logins),
+        f"pool ({args.workers} workers)": run(hasher.verify, hashed, args.concurrency, args.logins),
+    }
+    hasher.shutdown()
+
+    print(f"bcrypt cost {args.rounds}, {args.logins} logins from {args.concurrency} sessions, {os.cpu_count()} CPU(s)")
+    for name, r in results.items():
+        print(f"{name:>18}: {r['hashes_per_s']:6.1f} hashes/s, login p50 {r['p50_ms']:7.1f} ms, "
+              f"p99 {r['p99_ms']:7.1f} ms, other-session timer lag p99 {r['timer_lag_p99_ms']:6.1f} ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"rounds": args.rounds, "concurrency": args.concurrency, "logins": args.logins,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
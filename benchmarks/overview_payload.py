@@ -0,0 +1,75 @@
+"""
+Messages and bytes one Overview refresh sends to the browser, per renderer.
+
+Runs overview() in a headless Streamlit session (AppTest) with synthetic telemetry,
+once with the single HTML metric grid and once with one st.metric per value, and
+reports what measure_payload() counted:
+
+    python benchmarks/overview_payload.py --runs 5
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from streamlit.testing.v1 import AppTest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APP = """
+import sys
+sys.path.insert(0, {repo!r})
+import random
+import streamlit as st
+from modules.dashboard import selected_columns
+from modules.navigation import overview
+from modules.payload_meter import measure_payload
+from modules.telemetry import TelemetryVector, column_index
+
+index = column_index(selected_columns)
+row = dict({{c: random.uniform(0, 500) for c in selected_columns}},
+           updated_at="2026-01-01T00:00:00+00:00", online=True, device_status="P")
+current = TelemetryVector.from_row(row, index)
+previous = TelemetryVector.from_row({{c: v * 0.9 for c, v in row.items() if c in index}}, index)
+alarm = {{"triggers": "\\\\x05", "updated_at": row["updated_at"]}}
+with measure_payload(st.session_state.renderer) as payload:
+    overview(current, current - previous, alarm, alarm, renderer=st.session_state.renderer)
+st.session_state.result = (payload.messages, payload.bytes)
+"""
+
+
+def measure(renderer, runs):
+    with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as f:
+        f.write(APP.format(repo=REPO))
+    try:
+        at = AppTest.from_file(f.name, default_timeout=60)
+        at.session_state.renderer = renderer
+        results = []
+        for _ in range(runs):
+            at.run()
+            if at.exception:
+                raise RuntimeError(at.exception[0].value)
+            results.append(at.session_state.result)
+    finally:
+        os.unlink(f.name)
+    messages, size = results[-1]
+    return {"messages": messages, "bytes": size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    results = {renderer: measure(renderer, args.runs) for renderer in ("native", "html")}
+    for name, r in results.items():
+        print(f"{name:>8}: {r['messages']:4d} messages, {r['bytes'] / 1024:6.1f} KB per refresh")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
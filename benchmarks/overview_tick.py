@@ -0,0 +1,102 @@
+"""
+Per-tick cost of the Overview snapshot path.
+
+Replays what the poller and overview() do with every new telemetry row (parse the RPC
+JSON, compare with the previous row, compute the deltas, append to the history, read
+the 15 values and 15 deltas) with the old DataFrame path and the TelemetryVector path,
+and reports the CPU time and peak memory allocated per tick:
+
+    python benchmarks/overview_tick.py --ticks 2000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.dashboard import selected_columns  # noqa: E402
+from modules.ring_buffer import TelemetryRing  # noqa: E402
+from modules.telemetry import TelemetryVector, column_index  # noqa: E402
+
+
+def rows(count):
+    """RPC-shaped telemetry rows with changing values."""
+    return [dict({column: random.uniform(0, 500) for column in selected_columns},
+                 inverter_id="inv001", online=True, device_status="P",
+                 updated_at=f"2026-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}+00:00")
+            for i in range(count)]
+
+
+def dataframe_tick(row, previous, ring):
+    parameters = pd.DataFrame([row])
+    if previous is not None and previous.equals(parameters):
+        return previous
+    base = previous if previous is not None else parameters
+    delta = parameters[selected_columns] - base[selected_columns]
+    ring.append(datetime.fromisoformat(parameters.updated_at[0]).timestamp(),
+                parameters[selected_columns].to_numpy(dtype=float)[0])
+    for column in selected_columns:
+        getattr(parameters, column)[0], getattr(delta, column)[0]
+    return parameters
+
+
+def vector_tick(row, previous, ring, index):
+    parameters = TelemetryVector.from_row(row, index)
+    if previous is not None and previous.same_as(parameters):
+        return previous
+    delta = parameters - previous if previous is not None else parameters.zeros_like()
+    ring.append(datetime.fromisoformat(parameters.updated_at).timestamp(), parameters.values)
+    for column in selected_columns:
+        parameters[column], delta[column]
+    return parameters
+
+
+def measure(tick, data):
+    previous = None
+    start = time.process_time()
+    for row in data:
+        previous = tick(row, previous)
+    cpu = (time.process_time() - start) / len(data)
+
+    previous = None
+    peaks = []
+    tracemalloc.start()
+    for row in data[:200]:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        previous = tick(row, previous)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+    return {"cpu_us_per_tick": cpu * 1e6, "peak_alloc_kb_per_tick": float(np.median(peaks)) / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--ticks", type=int, default=2000)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    data = rows(args.ticks)
+    index = column_index(selected_columns)
+    df_ring, vec_ring = TelemetryRing(selected_columns), TelemetryRing(selected_columns)
+    results = {
+        "dataframe": measure(lambda row, prev: dataframe_tick(row, prev, df_ring), data),
+        "vector": measure(lambda row, prev: vector_tick(row, prev, vec_ring, index), data),
+    }
+    for name, r in results.items():
+        print(f"{name:>10}: {r['cpu_us_per_tick']:8.1f} us CPU/tick, "
+              f"{r['peak_alloc_kb_per_tick']:7.1f} KB peak allocation/tick")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+How many concurrent dashboard sessions one server process carries.
+
+Drives `--sessions` simulated users at once, each a headless Streamlit session
+(AppTest) running main.py against the in-process fake backend: sign in, then cycle
+through every page (Overview -> Control & Commands -> Alarms & Warnings -> Fleet
+Overview -> Alarm History) for `--cycles` rounds. Every level
+of --sessions reports backend queries/second, rerun latency percentiles, resident
+memory per session and how busy the process kept the CPU:
+
+    python benchmarks/session_load.py --sessions 1 --sessions 5 --sessions 10 --json load.json
+    python benchmarks/session_load.py --sessions 20 --latency 0.05 --error-rate 0.01
+
+The browser-storage round trip in main() has no browser here; the harness answers it
+with the demo user's "remember me" token. Sessions of one run share the process-wide
+caches (client, poller, token cache), as they would on a server. AppTest swaps
+process-global state (st.secrets, the runtime) for each run, so only one rerun
+executes at a time; a session's rerun latency is its wait for that slot plus the run
+itself, and the wait is reported on its own as queueing.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+import modules.js_utils as js_utils  # noqa: E402
+from devtools.fake_supabase import DEMO_TOKEN  # noqa: E402
+
+PAGES = ("Overview", "Control & Commands", "Alarms & Warnings", "Fleet Overview", "Alarm History")
+# One AppTest run at a time (see above).
+RUN_LOCK = threading.Lock()
+# Alarm transitions go to a throwaway store, so Alarm History has real queries to run.
+ALARM_LOG = os.path.join(tempfile.mkdtemp(prefix="session_load-"), "alarm_events.sqlite3")
+
+
+def rss_bytes():
+    """Current resident set size (peak RSS where /proc is missing)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def signed_in(items):
+    return {"is_signed": "true", "access_token": DEMO_TOKEN, "user_email": None}
+
+
+def new_session(backend, timeout):
+    at = AppTest.from_file(os.path.join(REPO, "main.py"), default_timeout=timeout)
+    at.secrets["fake_backend"] = backend
+    at.secrets["alarm_log"] = {"path": ALARM_LOG}
+    return at
+
+
+def run_session(at, cycles, think, latencies, waits, failures):
+    """
+    Sign in, then visit PAGES `cycles` times, pausing `think` seconds between clicks.
+    Rerun wall times go to `latencies`, the time spent queueing for a run to `waits`.
+    """
+    def rerun(step):
+        start = time.perf_counter()
+        with RUN_LOCK:
+            waits.append(time.perf_counter() - start)
+            step()
+        latencies.append(time.perf_counter() - start)
+        if at.exception:
+            failures.append(at.exception[0].value)
+
+    rerun(at.run)
+    for _ in range(cycles):
+        for page in PAGES:
+            if not at.radio:
+                return
+            time.sleep(think)
+            rerun(lambda: at.radio[0].set_value(page).run())
+
+
+def backend_client():
+    """The fake client the sessions share (cached by get_client() on the first rerun)."""
+    from modules.db import get_client
+    return get_client()
+
+
+def percentiles_ms(seconds):
+    ms = np.array(seconds) * 1000
+    if not len(ms):
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {"p50": p50, "p95": p95, "p99": p99, "max": float(ms.max())}
+
+
+def run_level(sessions, cycles, think, backend, timeout):
+    latencies, waits, failures = [], [], []
+    ats = [new_session(backend, timeout) for _ in range(sessions)]
+    client = backend_client()
+    calls, errors = client.calls, client.errors
+    rss, cpu, wall = rss_bytes(), time.process_time(), time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        for future in [pool.submit(run_session, at, cycles, think, latencies, waits, failures) for at in ats]:
+            future.result()
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    rss_after = rss_bytes()
+    return {
+        "sessions": sessions,
+        "reruns": len(latencies),
+        "wall_s": wall,
+        "reruns_per_s": len(latencies) / wall,
+        "queries": client.calls - calls,
+        "queries_per_s": (client.calls - calls) / wall,
+        "backend_errors": client.errors - errors,
+        "app_exceptions": len(failures),
+        "rerun_ms": percentiles_ms(latencies),
+        "queue_ms": percentiles_ms(waits),
+        "rss_mb": rss_after / 2**20,
+        "rss_per_session_kb": max(0, rss_after - rss) / sessions / 1024,
+        # Share of one core the process used; the GIL keeps Python work near one core.
+        "cpu_util": cpu / wall,
+        "cpu_util_all_cores": cpu / wall / (os.cpu_count() or 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, action="append",
+                        help="concurrent sessions; repeat to ramp up (default 1, 5, 10)")
+    parser.add_argument("--cycles", type=int, default=3, help="rounds through the pages per session")
+    parser.add_argument("--think", type=float, default=1.0, help="seconds a user waits between clicks")
+    parser.add_argument("--inverters", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per backend call")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=120, help="seconds one rerun may take")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    backend = {"inverters": args.inverters, "latency": args.latency, "jitter": args.jitter,
+               "error_rate": args.error_rate, "seed": 0}
+    # main.py loads its images relative to the working directory.
+    os.chdir(REPO)
+    js_utils.load_many = signed_in
+    # Builds the shared client and imports every page once, so level 1 is not charged for it.
+    run_session(new_session(backend, args.timeout), 1, 0, [], [], [])
+
+    levels = []
+    for sessions in args.sessions or [1, 5, 10]:
+        r = run_level(sessions, args.cycles, args.think, backend, args.timeout)
+        levels.append(r)
+        print(f"{sessions:4d} sessions: {r['reruns_per_s']:6.1f} reruns/s  {r['queries_per_s']:7.1f} queries/s  "
+              f"rerun p50 {r['rerun_ms']['p50']:7.0f} ms  p95 {r['rerun_ms']['p95']:7.0f} ms  "
+              f"p99 {r['rerun_ms']['p99']:7.0f} ms  queue p95 {r['queue_ms']['p95']:7.0f} ms  "
+              f"{r['rss_per_session_kb']:7.0f} KB/session  cpu {r['cpu_util']:4.0%}  exceptions {r['app_exceptions']}")
+
+    if args.json:
+        report = {
+            "date": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "threads": threading.active_count(),
+            "config": dict(backend, cycles=args.cycles, think=args.think, pages=PAGES),
+            "levels": levels,
+        }
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
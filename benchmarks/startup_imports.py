@@ -0,0 +1,80 @@
+"""
+Import cost of the landing page path.
+
+Runs the top-level imports of main.py (what an anonymous visitor's first script run
+pays for) in fresh interpreters and reports the median wall time and which heavy
+dependencies got loaded. Pass --ref to compare against another git revision:
+
+    python benchmarks/startup_imports.py --ref HEAD~1
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import io
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ["pandas", "numpy", "plotly", "bcrypt", "protonmail", "skfuzzy", "scipy", "realtime"]
+
+PROBE = """
+import sys, time, json
+t = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - t
+print(json.dumps({{"seconds": elapsed, "heavy": sorted(m for m in {heavy!r} if m in sys.modules)}}))
+"""
+
+
+def landing_imports(tree):
+    """The module-level import statements of main.py in `tree`."""
+    with open(os.path.join(tree, "main.py"), encoding="utf-8") as f:
+        module = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in module.body
+                     if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def checkout(ref, target):
+    archive = subprocess.run(["git", "-C", REPO, "archive", ref], check=True, capture_output=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(target)
+    return target
+
+
+def measure(tree, repeats):
+    code = PROBE.format(imports=landing_imports(tree), heavy=HEAVY)
+    runs = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", code], cwd=tree, check=True,
+                             capture_output=True, text=True, env=dict(os.environ, PYTHONPATH=tree)).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    seconds = [r["seconds"] for r in runs]
+    return {"median_s": statistics.median(seconds), "min_s": min(seconds), "heavy_modules": runs[-1]["heavy"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--ref", help="git revision to compare against (e.g. HEAD~1)")
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    results = {"current": measure(REPO, args.repeats)}
+    if args.ref:
+        with tempfile.TemporaryDirectory() as tmp:
+            results[args.ref] = measure(checkout(args.ref, tmp), args.repeats)
+
+    for name, r in results.items():
+        print(f"{name:>12}: median {r['median_s'] * 1000:7.1f} ms, min {r['min_s'] * 1000:7.1f} ms, "
+              f"heavy modules: {', '.join(r['heavy_modules']) or '-'}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
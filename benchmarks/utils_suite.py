@@ -0,0 +1,145 @@
+"""
+Regression benchmarks for the hot paths in modules/utils.py.
+
+Every case is timed call by call after a warm-up; the report has ops/sec, p50/p95/p99
+latency and the peak memory traced during one call. Save a baseline, then compare
+later runs against it; the comparison exits with status 1 when a case's p50 latency
+got worse by more than --threshold (25% by default):
+
+    python benchmarks/utils_suite.py --save benchmarks/utils_baseline.json
+    python benchmarks/utils_suite.py --compare benchmarks/utils_baseline.json
+    python benchmarks/utils_suite.py --only flags --only sugeno
+
+hash_value/verify_value read their settings from the Streamlit secrets; the suite
+times the Hasher they delegate to directly, at --bcrypt-rounds.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import modules.utils as utils  # noqa: E402
+from modules.dashboard import selected_columns  # noqa: E402
+from modules.hashing import Hasher  # noqa: E402
+from modules.telemetry import TelemetryVector, column_index  # noqa: E402
+
+random.seed(20)
+
+
+def _flags(n):
+    return [{"Flag": f"Flag{i}", "Triggered": False} for i in range(n)]
+
+
+def build_cases(bcrypt_rounds):
+    """name -> (callable, iterations). Inputs are built here, outside the timed calls."""
+    hasher = Hasher(rounds=bcrypt_rounds, workers=1)
+    stored = hasher.hash("benchmark-password")
+    days = utils.get_last_30_days(datetime(2026, 1, 31))
+    power = [random.uniform(0, 100) for _ in range(30)]
+    index = column_index(selected_columns)
+    row = dict({c: random.uniform(0, 500) for c in selected_columns},
+               updated_at="2026-01-01T00:00:00+00:00", online=True, device_status="P")
+    previous = TelemetryVector.from_row({c: v * 0.9 for c, v in row.items() if c in index}, index)
+    flags8, flags16 = _flags(8), _flags(16)
+    rn_values = [random.uniform(0, 15) for _ in range(64)]
+
+    return {
+        "sugeno_inference": (lambda: utils.sugeno_inference(random.choice(rn_values)), 2000),
+        "flags.str_to_flags": (lambda: utils.str_to_flags("\\x5a", flags8), 20000),
+        "flags.flags_to_str": (lambda: utils.flags_to_str(flags16), 20000),
+        "flags.count_ones_in_hex": (lambda: utils.count_ones_in_hex("\\x5a"), 20000),
+        "hash.hash_value": (lambda: hasher.hash("benchmark-password"), 20),
+        "hash.verify_value": (lambda: hasher.verify("benchmark-password", stored), 20),
+        "get_last_30_days": (lambda: utils.get_last_30_days(datetime(2026, 1, 31)), 5000),
+        "chart.power": (lambda: utils.create_plotly_chart_power(days, power, "2026-01-31"), 100),
+        "chart.dcc": (lambda: utils.create_plotly_chart_dcc(days, power, "2026-01-31"), 100),
+        "overview.delta": (lambda: TelemetryVector.from_row(row, index) - previous, 20000),
+    }
+
+
+def run_case(fn, iterations):
+    for _ in range(max(3, iterations // 20)):
+        fn()
+    gc.collect()
+    gc.disable()
+    try:
+        latencies = np.empty(iterations)
+        for i in range(iterations):
+            start = time.perf_counter_ns()
+            fn()
+            latencies[i] = time.perf_counter_ns() - start
+    finally:
+        gc.enable()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) / 1000
+    return {
+        "ops_per_s": 1e9 / latencies.mean(),
+        "p50_us": p50,
+        "p95_us": p95,
+        "p99_us": p99,
+        "peak_kb": peak / 1024,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Names of the cases whose p50 grew by more than `threshold` (a fraction)."""
+    regressions = []
+    for name, r in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        change = r["p50_us"] / base["p50_us"] - 1
+        flag = "REGRESSION" if change > threshold else ""
+        print(f"{name:>26}: p50 {base['p50_us']:10.1f} -> {r['p50_us']:10.1f} us ({change:+7.1%}) {flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--only", action="append", help="run cases whose name starts with this (repeatable)")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--save", help="write the results as a baseline JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed p50 slowdown (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    cases = build_cases(args.bcrypt_rounds)
+    if args.only:
+        cases = {name: case for name, case in cases.items() if name.startswith(tuple(args.only))}
+
+    results = {}
+    for name, (fn, iterations) in cases.items():
+        r = results[name] = run_case(fn, iterations)
+        print(f"{name:>26}: {r['ops_per_s']:12.1f} ops/s  p50 {r['p50_us']:10.1f} us  "
+              f"p95 {r['p95_us']:10.1f} us  p99 {r['p99_us']:10.1f} us  peak {r['peak_kb']:8.1f} KB")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "bcrypt_rounds": args.bcrypt_rounds, "results": results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print()
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+"""
+In-process stand-in for the Supabase client, for running, load-testing and
+benchmarking the dashboard without a Supabase project.
+
+It implements the query-builder chains the app uses (`table().select().eq().execute()`,
+`in_`, `update`, `upsert`, `insert`, `delete`, `order`, `limit`) and the
+`fetch_data_for_user_inv` / `fetch_inverter_snapshot` RPCs on in-memory tables
+seeded with synthetic inverters. Every `execute()` can be slowed down and made to
+fail, to see how the dashboard copes with a slow or flaky backend.
+
+Enable it in `.streamlit/secrets.toml` (no `url`/`anon_key` needed):
+
+    [fake_backend]
+    inverters = 20        # synthetic inverters (at most 999), all linked to the demo user
+    latency = 0.05        # seconds added to every call
+    jitter = 0.02         # +/- uniform noise on the latency
+    error_rate = 0.01     # share of calls that raise postgrest.APIError
+    seed = 0
+
+    [realtime]
+    enabled = false
+
+Sign in with DEMO_EMAIL / DEMO_PASSWORD.
+"""
+import copy
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from postgrest.exceptions import APIError
+from modules.utils import TELEMETRY_TABLE, battery_parameters, make_int_2inices, make_int_3inices
+
+DEMO_EMAIL = "demo@solsync.local"
+DEMO_PASSWORD = "solsync-demo"
+DEMO_PIN = "1234"
+DEMO_TOKEN = "demo-access-token"
+
+# Telemetry columns with (typical value, random-walk step) of the synthetic inverters.
+TELEMETRY_PROFILE = {
+    "grid_voltage_input": (230.0, 2.0),
+    "grid_frequency_input": (50.0, 0.05),
+    "ac_output_voltage": (230.0, 1.0),
+    "ac_output_frequency": (50.0, 0.05),
+    "ac_output_apparent_power": (1200.0, 60.0),
+    "ac_output_active_power": (1100.0, 60.0),
+    "ac_output_power_percentage": (25.0, 1.5),
+    "battery_voltage": (26.5, 0.1),
+    "battery_charging_current": (10.0, 1.0),
+    "battery_charging_power": (265.0, 25.0),
+    "battery_discharging_current": (2.0, 0.5),
+    "inverter_temperature": (38.0, 0.5),
+    "pv_input_voltage": (120.0, 4.0),
+    "pv_input_current": (8.0, 0.6),
+    "pv_input_power": (960.0, 60.0),
+}
+# Seconds between two synthetic telemetry updates (the devices' upload cadence).
+TELEMETRY_INTERVAL = 10
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def seed_tables(inverters=10, seed=0):
+    """
+    Tables with one demo user owning `inverters` synthetic inverters, named like real
+    ones ("inv001" ...), so at most 999.
+    """
+    if not 0 < inverters <= 999:
+        raise ValueError(f"inverters must be between 1 and 999, got {inverters}")
+    import bcrypt
+
+    rng = random.Random(seed)
+    now = _now()
+    # Hashed once: bcrypt is slow on purpose.
+    password = bcrypt.hashpw(DEMO_PASSWORD.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    pin = bcrypt.hashpw(DEMO_PIN.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    defaults = battery_parameters["24"]
+    ids = [f"inv{i:03d}" for i in range(1, inverters + 1)]
+    stats_date = (datetime.now(timezone.utc) - timedelta(hours=6)).isoformat()
+
+    return {
+        "user_authentication": [
+            {"id": 1, "username": "demo", "email": DEMO_EMAIL, "password": password, "access_token": DEMO_TOKEN},
+        ],
+        "company_inverters": [{"inverter_id": i, "user_id": 1, "pin_code": pin} for i in ids],
+        TELEMETRY_TABLE: [
+            dict({column: round(rng.gauss(value, step * 3), 2) for column, (value, step) in TELEMETRY_PROFILE.items()},
+                 inverter_id=i, updated_at=now, online=rng.random() > 0.1, device_status=rng.choice("PSLB"))
+            for i in ids
+        ],
+        "critical_alarms": [
+            {"inverter_id": i, "triggers": "\\x%02x" % (1 << rng.randrange(8) if rng.random() < 0.2 else 0),
+             "updated_at": now}
+            for i in ids
+        ],
+        "maintenance_warnings": [
+            {"inverter_id": i, "triggers": "\\x%02x" % (1 << rng.randrange(4) if rng.random() < 0.3 else 0),
+             "updated_at": now}
+            for i in ids
+        ],
+        "SOH": [
+            {"inverter_id": i, "Rn": round(rng.uniform(0.5, 12), 2), "statistics_ready": True,
+             "statistics_ready_date": stats_date, "CFDC": False, "battery_cheak": False, "clean_PV_panels": False,
+             "Pday_copy": [round(rng.uniform(10, 90), 1) for _ in range(30)],
+             "Cday_copy": [rng.randrange(0, 3) for _ in range(30)]}
+            for i in ids
+        ],
+        "battery_system": [
+            {"inverter_id": i, "battery_voltage": 24, "battery_AH": 100, "battery_type": 1, "enable_commands": True}
+            for i in ids
+        ],
+        "commands_state": [
+            {"inverter_id": i,
+             "source_priority": make_int_2inices(defaults["source_priority"]),
+             "u_max_cc": make_int_3inices(defaults["u_max_cc"]),
+             "s_max_cc": make_int_3inices(defaults["s_max_cc"]),
+             "battery_cov": str(round(defaults["battery_cov"], 1)),
+             "battery_cv": str(round(defaults["battery_cv"], 1)),
+             "battery_fcv": str(round(defaults["battery_fcv"], 1)),
+             "battery_type": make_int_2inices(defaults["battery_type"]),
+             "buzzer_st": defaults["buzzer_st"], "ov_bypass_st": defaults["ov_bypass_st"],
+             "temp_rst_st": defaults["temp_rst_st"], "bck_light_st": defaults["bck_light_st"],
+             "psi_alarm_st": defaults["psi_alarm_st"], "defult_value": False,
+             "battery_lv_th": round(defaults["battery_lv_th"], 1), "ac_lv_th": round(defaults["ac_lv_th"], 1),
+             "ac_ol_th": round(defaults["ac_ol_th"], 1), "battery_dc_th": round(defaults["battery_dc_th"], 1),
+             "cf": False}
+            for i in ids
+        ],
+    }
+
+
+class FakeResponse:
+    __slots__ = ("data", "count")
+
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    """One `table(...)` chain; filters and the operation are applied on `execute()`."""
+
+    def __init__(self, client, table):
+        self._client = client
+        self._table = table
+        self._filters = []
+        self._columns = None
+        self._operation = "select"
+        self._values = None
+        self._on_conflict = None
+        self._order = None
+        self._limit = None
+
+    def select(self, *columns, count=None):
+        if columns and columns != ("*",):
+            self._columns = [c.strip() for column in columns for c in column.split(",")]
+        return self
+
+    def eq(self, column, value):
+        self._filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def neq(self, column, value):
+        self._filters.append(lambda row: row.get(column) != value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self._filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def is_(self, column, value):
+        value = None if value in (None, "null") else value
+        self._filters.append(lambda row: row.get(column) is value)
+        return self
+
+    def order(self, column, desc=False):
+        self._order = (column, desc)
+        return self
+
+    def limit(self, size):
+        self._limit = size
+        return self
+
+    def insert(self, values):
+        self._operation, self._values = "insert", values
+        return self
+
+    def upsert(self, values, on_conflict=None, **kwargs):
+        self._operation, self._values = "upsert", values
+        if isinstance(on_conflict, str):
+            on_conflict = on_conflict.split(",")
+        self._on_conflict = list(on_conflict or ["id"])
+        return self
+
+    def update(self, values):
+        self._operation, self._values = "update", values
+        return self
+
+    def delete(self):
+        self._operation = "delete"
+        return self
+
+    def execute(self):
+        return self._client._call(self._run)
+
+    def _project(self, row):
+        if self._columns is None:
+            return dict(row)
+        return {column: row.get(column) for column in self._columns}
+
+    def _run(self, tables):
+        rows = tables.setdefault(self._table, [])
+        if self._operation in ("insert", "upsert"):
+            new_rows = self._values if isinstance(self._values, list) else [self._values]
+            written = []
+            for values in new_rows:
+                target = None
+                if self._operation == "upsert":
+                    target = next((row for row in rows
+                                   if all(row.get(k) == values.get(k) for k in self._on_conflict)), None)
+                if target is None:
+                    target = dict(values)
+                    if "id" not in target and self._table == "user_authentication":
+                        target["id"] = max((row.get("id", 0) for row in rows), default=0) + 1
+                    rows.append(target)
+                else:
+                    target.update(values)
+                written.append(dict(target))
+            return FakeResponse(written)
+
+        matched = [row for row in rows if all(f(row) for f in self._filters)]
+        if self._operation == "update":
+            for row in matched:
+                row.update(self._values)
+        elif self._operation == "delete":
+            tables[self._table] = [row for row in rows if row not in matched]
+        if self._order is not None:
+            column, desc = self._order
+            matched.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        if self._limit is not None:
+            matched = matched[:self._limit]
+        return FakeResponse([self._project(row) for row in matched])
+
+
+class FakeRPC:
+    def __init__(self, client, name, params):
+        self._client = client
+        self._name = name
+        self._params = params or {}
+
+    def execute(self):
+        return self._client._call(self._run)
+
+    def _run(self, tables):
+        uid, inv_id = self._params.get("uid"), self._params.get("inv_id")
+        owned = any(row["inverter_id"] == inv_id and row.get("user_id") == uid for row in tables["company_inverters"])
+        telemetry = [dict(row) for row in tables[TELEMETRY_TABLE] if row["inverter_id"] == inv_id] if owned else []
+        if self._name == "fetch_data_for_user_inv":
+            return FakeResponse(telemetry)
+        if self._name == "fetch_inverter_snapshot":
+            def one(table, columns):
+                row = next((row for row in tables[table] if row["inverter_id"] == inv_id), None)
+                return {column: row.get(column) for column in columns} if owned and row else None
+
+            return FakeResponse({
+                "telemetry": telemetry,
+                "critical_alarms": one("critical_alarms", ("triggers", "updated_at")),
+                "maintenance_warnings": one("maintenance_warnings", ("triggers", "updated_at")),
+                "soh": one("SOH", ("Rn", "statistics_ready", "statistics_ready_date", "Cday_copy", "Pday_copy")),
+            })
+        raise APIError({"message": f"Could not find the function public.{self._name}", "code": "PGRST202"})
+
+
+class FakeSupabase:
+    """
+    Drop-in for the `supabase.Client` calls the app makes.
+
+    Parameters:
+      tables: initial tables ({name: [row, ...]}); `seed_tables()` when None.
+      latency, jitter: seconds added to every `execute()` (latency +/- uniform jitter).
+      error_rate: probability that an `execute()` raises postgrest.APIError instead.
+      telemetry_interval: seconds between synthetic telemetry updates (0 = frozen).
+    """
+    realtime_url = None
+    supabase_key = "fake-anon-key"
+
+    def __init__(self, tables=None, latency=0.0, jitter=0.0, error_rate=0.0, seed=None,
+                 telemetry_interval=TELEMETRY_INTERVAL, inverters=10):
+        self.tables = tables if tables is not None else seed_tables(inverters, seed or 0)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.telemetry_interval = telemetry_interval
+        self.calls = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._last_tick = time.monotonic()
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def from_(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params=None):
+        return FakeRPC(self, name, params)
+
+    def _call(self, run):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            fail = self._rng.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if fail:
+            with self._lock:
+                self.errors += 1
+            raise APIError({"message": "Injected failure (fake backend)", "code": "503"})
+        with self._lock:
+            self._tick()
+            # Callers get copies, like rows decoded from a real response.
+            return copy.deepcopy(run(self.tables))
+
+    def _tick(self):
+        # Random-walk the telemetry once per interval, as uploads from the devices would.
+        if not self.telemetry_interval or time.monotonic() - self._last_tick < self.telemetry_interval:
+            return
+        self._last_tick = time.monotonic()
+        now = _now()
+        for row in self.tables.get(TELEMETRY_TABLE, []):
+            for column, (value, step) in TELEMETRY_PROFILE.items():
+                row[column] = round(row.get(column, value) + self._rng.gauss(0, step), 2)
+            row["updated_at"] = now
+
+
+def create_fake_client(settings=None):
+    """FakeSupabase configured from a `[fake_backend]` secrets section (or dict)."""
+    settings = dict(settings or {})
+    settings.pop("enabled", None)
+    return FakeSupabase(**settings)
@@ -0,0 +1,102 @@
+"""
+Local SMTP stand-in for the email outbox, for exercising the password recovery flow
+without a ProtonMail account.
+
+It accepts any sender and recipient, keeps every message in memory and prints the
+recipient and subject of each one it receives. Point the outbox at it in
+`.streamlit/secrets.toml`:
+
+    [outbox]
+    transport = "smtp"
+    host = "localhost"
+    port = 1025
+
+    python -m devtools.mail_standin --port 1025
+
+Set `fail_next` on an instance to make the next N messages fail with a 451, to watch
+the outbox retry.
+"""
+import argparse
+import asyncio
+from email import message_from_bytes, policy
+
+
+class MailStandIn:
+    def __init__(self, host="localhost", port=1025, on_message=None):
+        self.host = host
+        self.port = port
+        self.on_message = on_message
+        self.messages = []
+        self.fail_next = 0
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        def reply(line):
+            writer.write(line.encode() + b"\r\n")
+
+        reply("220 mail stand-in ready")
+        recipients = []
+        try:
+            while line := await reader.readline():
+                command = line.decode(errors="replace").strip()
+                verb = command[:4].upper()
+                if verb in ("HELO", "EHLO"):
+                    reply("250 stand-in")
+                elif verb == "MAIL":
+                    recipients = []
+                    reply("250 OK")
+                elif verb == "RCPT":
+                    recipients.append(command.split(":", 1)[1].strip(" <>"))
+                    reply("250 OK")
+                elif verb == "DATA":
+                    reply("354 End data with <CR><LF>.<CR><LF>")
+                    await writer.drain()
+                    data = []
+                    while (chunk := await reader.readline()) not in (b".\r\n", b".\n", b""):
+                        # Undo the SMTP dot-stuffing.
+                        data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                    if self.fail_next > 0:
+                        self.fail_next -= 1
+                        reply("451 Requested action aborted: local error in processing")
+                    else:
+                        message = message_from_bytes(b"".join(data), policy=policy.default)
+                        self.messages.append((recipients, message))
+                        if self.on_message:
+                            self.on_message(recipients, message)
+                        reply("250 OK: queued")
+                elif verb == "QUIT":
+                    reply("221 Bye")
+                    break
+                elif verb in ("RSET", "NOOP"):
+                    reply("250 OK")
+                else:
+                    reply("502 Command not implemented")
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+async def _main(host, port):
+    def show(recipients, message):
+        print(f"to {', '.join(recipients)}: {message['Subject']}")
+
+    await MailStandIn(host, port, on_message=show).start()
+    print(f"Mail stand-in listening on smtp://{host}:{port}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+    asyncio.run(_main(args.host, args.port))
@@ -0,0 +1,136 @@
+"""
+Local stand-in for the Supabase Realtime websocket, for exercising the push-based
+Overview without a Supabase project.
+
+It speaks just enough of the Phoenix channel protocol used by the `realtime` client:
+channel joins (replying with ids for every `postgres_changes` binding), heartbeats,
+leaves, and `postgres_changes` pushes.
+
+Run it next to the app and point the feed at it in `.streamlit/secrets.toml`:
+
+    [realtime]
+    url = "ws://localhost:4000/realtime/v1"
+
+    python -m devtools.realtime_standin --port 4000
+
+Then type commands on stdin:
+    change <table> <inverter_id>   push an UPDATE for that row
+    drop                           close every connection (the app falls back to polling)
+"""
+import argparse
+import asyncio
+import json
+import itertools
+from datetime import datetime, timezone
+from websockets.asyncio.server import serve
+
+
+class RealtimeStandIn:
+    def __init__(self, host="localhost", port=4000):
+        self.host = host
+        self.port = port
+        self._ids = itertools.count(1)
+        # websocket -> {topic: [(binding_id, filter_dict), ...]}
+        self._clients = {}
+        self._server = None
+
+    async def start(self):
+        self._server = await serve(self._handle, self.host, self.port)
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    @property
+    def subscriptions(self):
+        """Number of joined channels over all connections."""
+        return sum(len(topics) for topics in self._clients.values())
+
+    async def emit(self, table, inverter_id, record=None, change="UPDATE"):
+        """Push a row change to every channel bound to `table` and `inverter_id`."""
+        record = dict(record or {}, inverter_id=inverter_id)
+        sent = 0
+        for ws, topics in list(self._clients.items()):
+            for topic, bindings in topics.items():
+                ids = [binding_id for binding_id, f in bindings
+                       if f.get("table") in (table, "*")
+                       and f.get("filter") in (None, f"inverter_id=eq.{inverter_id}")]
+                if not ids:
+                    continue
+                payload = {
+                    "ids": ids,
+                    "data": {
+                        "type": change,
+                        "schema": "public",
+                        "table": table,
+                        "commit_timestamp": datetime.now(timezone.utc).isoformat(),
+                        "record": record,
+                        "old_record": {},
+                        "columns": [],
+                        "errors": None,
+                    },
+                }
+                await ws.send(json.dumps({"topic": topic, "event": "postgres_changes",
+                                          "payload": payload, "ref": None}))
+                sent += 1
+        return sent
+
+    async def drop(self):
+        """Close every client connection, as a Realtime outage would."""
+        for ws in list(self._clients):
+            await ws.close()
+
+    async def _handle(self, ws):
+        self._clients[ws] = {}
+        try:
+            async for raw in ws:
+                msg = json.loads(raw)
+                topic, event, ref = msg.get("topic"), msg.get("event"), msg.get("ref")
+                response = {}
+                if event == "phx_join":
+                    config = msg.get("payload", {}).get("config", {})
+                    bindings = []
+                    for f in config.get("postgres_changes", []):
+                        binding_id = next(self._ids)
+                        bindings.append((binding_id, f))
+                        response.setdefault("postgres_changes", []).append(dict(f, id=binding_id))
+                    self._clients[ws][topic] = bindings
+                elif event == "phx_leave":
+                    self._clients[ws].pop(topic, None)
+                await ws.send(json.dumps({"topic": topic, "event": "phx_reply",
+                                          "payload": {"status": "ok", "response": response},
+                                          "ref": ref}))
+        finally:
+            self._clients.pop(ws, None)
+
+
+async def _repl(standin):
+    loop = asyncio.get_running_loop()
+    while True:
+        line = await loop.run_in_executor(None, input, "> ")
+        parts = line.split()
+        if not parts:
+            continue
+        if parts[0] == "change" and len(parts) == 3:
+            print(f"sent to {await standin.emit(parts[1], parts[2])} channel(s)")
+        elif parts[0] == "drop":
+            await standin.drop()
+            print("connections closed")
+        else:
+            print("commands: change <table> <inverter_id> | drop")
+
+
+async def _main(host, port):
+    standin = await RealtimeStandIn(host, port).start()
+    print(f"Realtime stand-in listening on ws://{host}:{port}")
+    await _repl(standin)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=4000)
+    args = parser.parse_args()
+    asyncio.run(_main(args.host, args.port))
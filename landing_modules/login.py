@@ -4,6 +4,9 @@ from postgrest.exceptions import APIError
 from time import sleep
 import modules.utils as utils
 import modules.js_utils as js_utils
+from modules.hashing import HashingBusy
+from modules.auth_cache import get_token_cache
+from modules.query_metrics import timed_execute
 
 def login(supabase):
     # Initialize session state values if not already set.
@@ -75,23 +78,26 @@ def login(supabase):
         elif st.session_state['flags']['sign_up_success']:
             st.success("Account created successfully!", icon="✅")
         elif st.session_state['flags']['sign_in_success']:
-            # Mark the user as signed in (session-only).
-            js_utils.save_to_storage("sessionStorage", "is_signed", True)
-            # Save the user's email so that the main function can later look it up.
-            js_utils.save_to_storage("sessionStorage", "user_email", st.session_state['email_token'])
+            # Mark the user as signed in (session-only) and save the user's email so that
+            # the main function can later look it up. Written together with the refresh below.
+            storage_items = [("sessionStorage", "is_signed", True),
+                             ("sessionStorage", "user_email", st.session_state['email_token'])]
             
             token = ""
             if st.session_state['remember_me']:
                 # If "Remember Me" is checked, generate a token and save it in local storage.
                 token = utils.hash_to_complex_string(st.session_state['email_token'])
-                js_utils.save_to_storage("localStorage", "access_token", token)
+                storage_items.append(("localStorage", "access_token", token))
                 # Update Supabase user authentication record with the new token.
-                supabase.table("user_authentication").update({'access_token': token}).eq("email", st.session_state['email_token']).execute()
+                timed_execute("user_authentication.update_token",
+                              supabase.table("user_authentication").update({'access_token': token}).eq("email", st.session_state['email_token']))
                 # Query using the token.
-                data = supabase.table("user_authentication").select("id").eq("access_token", token).execute()
+                data = timed_execute("user_authentication.select_by_access_token",
+                                     supabase.table("user_authentication").select("id").eq("access_token", token))
             else:
                 # Query using the email if no token is stored.
-                data = supabase.table("user_authentication").select("id").eq("email", st.session_state['email_token']).execute()
+                data = timed_execute("user_authentication.select_by_email",
+                                     supabase.table("user_authentication").select("id").eq("email", st.session_state['email_token']))
             
             if data.data and len(data.data) > 0:
                 userID = data.data[0]['id']
@@ -102,7 +108,8 @@ def login(supabase):
             
             st.success("Access granted!", icon="✅")
             sleep(0.5)
-            js_utils.refresh()  # Force a browser refresh if necessary.
+            # Save the sign-in state and force a browser refresh in one JS round trip.
+            js_utils.save_many(storage_items, reload=True)
             st.rerun()
 
 def signup(supabase):
@@ -161,10 +168,9 @@ def signup(supabase):
             # Verify the provided inverter_id exists and that the provided pin_code matches
             # the company record before creating a new user.
             try:
-                inverter_data_response = supabase.table("company_inverters") \
+                inverter_data_response = timed_execute("company_inverters.select_by_id", supabase.table("company_inverters") \
                     .select("inverter_id", "pin_code") \
-                    .eq("inverter_id", inverter_id) \
-                    .execute()
+                    .eq("inverter_id", inverter_id))
                 
                 if not inverter_data_response.data:
                     st.session_state['flags']['inverter_wrong_info'] = True
@@ -178,17 +184,20 @@ def signup(supabase):
                     st.session_state['flags']['inverter_wrong_info'] = True
                     st.error("Provided PIN Code does not match our records for the given Inverter ID.")
                     return
+            except HashingBusy as e:
+                st.error(str(e))
+                return
             except Exception as e:
                 st.error(f"Error accessing company inverter data: {e}")
                 return
             
             # Proceed with user registration.
             try:
-                response = supabase.table("user_authentication").insert({
+                response = timed_execute("user_authentication.insert", supabase.table("user_authentication").insert({
                     "username": username,
                     "password": utils.hash_value(password),
                     "email": email,
-                }).execute()
+                }))
                 
                 if response.data and len(response.data) > 0:
                     new_user = response.data[0]
@@ -196,10 +205,9 @@ def signup(supabase):
                     
                     # **Link the User with the Inverter:**
                     # Update the company_inverters table to link this inverter with the new user.
-                    link_response = supabase.table("company_inverters") \
+                    link_response = timed_execute("company_inverters.link", supabase.table("company_inverters") \
                         .update({"user_id": user_id}) \
-                        .eq("inverter_id", inverter_id) \
-                        .execute()
+                        .eq("inverter_id", inverter_id))
                     
                     if not (link_response.data and len(link_response.data) > 0):
                         st.error("Failed to link your account with the inverter. Please try again later.")
@@ -212,6 +220,8 @@ def signup(supabase):
                     st.session_state['toggle_text'] = "Don't have an account?"
                     sleep(2)
                     st.rerun()
+            except HashingBusy as e:
+                st.error(str(e))
             except APIError as e:
                 st.session_state['flags']['user_already_exists'] = True
 
@@ -251,8 +261,15 @@ def signin(supabase):
                     if all(not st.session_state['flags'][flag] for flag in flags_to_check):
                         # user_response = supabase.table("user_authentication").select("id").eq("email", email).execute()
                         if recovery_code == st.session_state["recovery_code"]:
-                            supabase.table("user_authentication").update({"password":utils.hash_value(new_password)}).eq("email", email).execute()
-                            st.success("Password reset")
+                            try:
+                                response = timed_execute("user_authentication.update_password",
+                                                         supabase.table("user_authentication").update({"password":utils.hash_value(new_password)}).eq("email", email))
+                                # Sessions remembered under the old password must sign in again.
+                                for row in response.data:
+                                    get_token_cache().invalidate_user(row["id"])
+                                st.success("Password reset")
+                            except HashingBusy as e:
+                                st.error(str(e))
                         else:
                             st.error("This code is wrong")
                 
@@ -260,9 +277,7 @@ def signin(supabase):
                     if email:
                         if not st.session_state["clicked_once"]:
                             st.session_state["clicked_once"] = True
-                            api_email = st.secrets.email
-                            api_pass = st.secrets.password
-                            st.session_state["recovery_code"] = utils.send_one_time_backup_code(api_email, api_pass, email.strip())
+                            st.session_state["recovery_code"] = utils.send_one_time_backup_code(email.strip())
                             # st.session_state["recovery_code"] = "3VFO-S14S"
                             st.success("Recovery code sent")
                         else:
@@ -286,9 +301,23 @@ def signin(supabase):
 
         flags_to_check = ["invalid_email", "password_too_short", "missing_data", "incorrect_credentials"]
         if all(not st.session_state['flags'][flag] for flag in flags_to_check):
-            data = supabase.table("user_authentication").select("*").eq("email", email).execute()
-            if len(data.data) and utils.verify_value(password, data.data[0]['password']):
+            data = timed_execute("user_authentication.select_for_sign_in",
+                                 supabase.table("user_authentication").select("*").eq("email", email))
+            try:
+                verified = len(data.data) and utils.verify_value(password, data.data[0]['password'])
+            except HashingBusy as e:
+                st.error(str(e))
+                return
+            if verified:
                 st.session_state['flags']['sign_in_success'] = True
+                # Upgrade hashes made with an older work factor while the password is at hand.
+                # Best effort: when the hashing pool is busy the upgrade waits for the next sign-in.
+                if utils.needs_rehash(data.data[0]['password']):
+                    try:
+                        timed_execute("user_authentication.rehash_password",
+                                      supabase.table("user_authentication").update({"password": utils.hash_value(password)}).eq("id", data.data[0]['id']))
+                    except HashingBusy:
+                        pass
             else:
                 st.session_state['flags']['incorrect_credentials'] = True
 
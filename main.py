@@ -1,17 +1,15 @@
 import streamlit as st
 from landing_modules import home as Home, pricing, products, login
-from modules.dashboard import *
 from PIL import Image
 import modules.js_utils as js_utils
-from time import sleep
-from supabase import create_client
+from modules.db import get_client
+from modules.auth_cache import resolve_user
+from modules.profiler import profiled, capture_rerun
 import os
 
 
-# Initialize Supabase client using secrets.
-url = st.secrets.url
-key = st.secrets.anon_key
-supabase = create_client(url, key)
+# Shared, pooled Supabase client (built once per server process from the secrets).
+supabase = get_client()
 
 # Check if running on Streamlit Cloud or locally
 if os.path.exists(r"/mount/src/solsync-streamlit/images/solsync_logo.png"):
@@ -26,6 +24,7 @@ else:
 # Open the image
 image_array = Image.open(image_path)
 
+@profiled("main")
 def main():
     st.set_page_config(page_title="SolSync", page_icon="🔆", layout="wide")
     if 'title' not in st.session_state:
@@ -35,39 +34,44 @@ def main():
 
     with inv1:
         st.image(image_array, width=200)
-    # Load stored sign-in status and convert to boolean robustly.
+    # Load the sign-in flag, the "remember me" access token and the user email
+    # from browser storage in a single component round trip.
     with inv2:
-        session_value_raw = js_utils.load_from_session_storage("is_signed")
-    session_value = session_value_raw.lower() == "true" if session_value_raw and isinstance(session_value_raw, str) else False
+        stored = js_utils.load_many([("sessionStorage", "is_signed"),
+                                     ("localStorage", "access_token"),
+                                     ("sessionStorage", "user_email")])  # Ensure you save this during login
+    if stored is None:
+        # The browser answers asynchronously and its reply reruns the script right away.
+        st.stop()
 
-    # Load access token (for "remember me") and user email (if available) from storage.
-    with inv3:
-        local_value = js_utils.load_from_local_storage("access_token")
-    with inv4:
-        user_email = js_utils.load_from_session_storage("user_email")  # Ensure you save this during login
+    # Convert the stored sign-in status to boolean robustly.
+    session_value_raw = stored.get("is_signed")
+    session_value = session_value_raw.lower() == "true" if session_value_raw and isinstance(session_value_raw, str) else False
+    local_value = stored.get("access_token")
+    user_email = stored.get("user_email")
 
-    sleep(2)
-    
     # If the user is signed in either via the session flag or via a persistent token.
     if session_value or (local_value and local_value.strip() != ""):
         if 'user_id' not in st.session_state:
             # Use the access token if available; otherwise, lookup by email.
-            if local_value and local_value.strip() != "":
-                data = supabase.table("user_authentication").select("id", "username").eq("access_token", local_value).execute()
-            elif user_email and user_email.strip() != "":
-                data = supabase.table("user_authentication").select("id", "username").eq("email", user_email).execute()
-            else:
+            # Returning users are served from the process-wide identity cache.
+            access_token = local_value.strip() if local_value and local_value.strip() != "" else None
+            email = user_email.strip() if user_email and user_email.strip() != "" else None
+            if access_token is None and email is None:
                 st.error("User identifier missing.")
                 return
 
-            if data.data and len(data.data) > 0:
-                st.session_state['user_id'] = data.data[0]['id']
-                st.session_state['username'] = data.data[0]['username']
+            user = resolve_user(supabase, access_token=access_token, email=email)
+            if user is not None:
+                st.session_state['user_id'], st.session_state['username'] = user
 
             else:
                 st.error("Could not retrieve user ID from the database.")
                 return
             
+        # Imported here so anonymous visitors never load the dashboard chain
+        # (pandas, plotly, the poller and the Realtime client).
+        from modules.dashboard import dashboard
         dashboard(user_id=st.session_state['user_id'], username=st.session_state['username'], supabase=supabase)
     
     else:
@@ -120,4 +124,6 @@ def main():
             page_selection[st.session_state['page']]()
 
 if __name__ == "__main__":
-    main()
+    # Profiled with cProfile when the session asked for it (Diagnostics panel).
+    with capture_rerun():
+        main()
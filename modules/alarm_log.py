@@ -0,0 +1,148 @@
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+import streamlit as st
+from modules.alarms import AlarmMask
+
+logger = logging.getLogger(__name__)
+
+# Default location of the event store, overridable with `[alarm_log] path` in the secrets.
+ALARM_LOG_PATH = "alarm_events.sqlite3"
+# Pending events are written at least this often (seconds) ...
+FLUSH_INTERVAL = 5
+# ... or as soon as this many are waiting.
+FLUSH_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alarm_events (
+    inverter_id TEXT NOT NULL,
+    kind TEXT NOT NULL,          -- "critical" or "maintenance"
+    flag INTEGER NOT NULL,       -- bit index in the catalog of `kind`
+    raised INTEGER NOT NULL,     -- 1 = raised, 0 = cleared
+    ts REAL NOT NULL             -- unix time of the triggers update
+);
+CREATE INDEX IF NOT EXISTS alarm_events_inverter_ts ON alarm_events (inverter_id, ts);
+CREATE TABLE IF NOT EXISTS alarm_state (
+    inverter_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    mask TEXT NOT NULL,          -- last seen triggers, "\\xNN..."
+    PRIMARY KEY (inverter_id, kind)
+);
+"""
+
+
+class AlarmLog:
+    """
+    Append-only log of alarm transitions.
+
+    `observe()` is called with every polled `triggers` value; the XOR with the last
+    known mask of that inverter gives the flipped bits, which become raise/clear
+    events. The last masks are persisted too, so a restart doesn't lose or invent
+    transitions. Events are buffered and written in one transaction per
+    FLUSH_INTERVAL seconds or FLUSH_BATCH events, by a background thread.
+    """
+
+    def __init__(self, path=ALARM_LOG_PATH, flush_interval=FLUSH_INTERVAL, flush_batch=FLUSH_BATCH):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._db_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        # (inverter_id, kind) -> last seen mask (int)
+        self._state = {(inverter_id, kind): int(AlarmMask.from_hex(mask)) for inverter_id, kind, mask
+                       in self._db.execute("SELECT inverter_id, kind, mask FROM alarm_state")}
+        self._pending_events = []
+        self._pending_state = {}
+        self._thread = threading.Thread(target=self._run, name="alarm-log", daemon=True)
+        self._thread.start()
+
+    def observe(self, inverter_id, kind, triggers, updated_at=None):
+        """
+        Record the transitions between the last known `triggers` of (inverter_id, kind)
+        and this one. `updated_at` (ISO string) timestamps the events; defaults to now.
+        Returns the number of events emitted.
+        """
+        if triggers is None:
+            return 0
+        mask = int(AlarmMask.from_hex(triggers))
+        key = (inverter_id, kind)
+        with self._lock:
+            previous = self._state.get(key)
+            if previous == mask:
+                return 0
+            self._state[key] = mask
+            self._pending_state[key] = triggers
+            if previous is None:
+                # First sighting: this is the baseline, not a transition.
+                return 0
+            ts = datetime.fromisoformat(updated_at).timestamp() if updated_at else time.time()
+            changed = AlarmMask(previous ^ mask)
+            events = [(inverter_id, kind, flag, int(flag in AlarmMask(mask)), ts) for flag in changed]
+            self._pending_events.extend(events)
+            if len(self._pending_events) >= self.flush_batch:
+                self._wake.set()
+        return len(events)
+
+    def flush(self):
+        """Write every pending event and mask in one transaction."""
+        with self._lock:
+            events, self._pending_events = self._pending_events, []
+            state, self._pending_state = self._pending_state, {}
+        if not events and not state:
+            return
+        try:
+            with self._db_lock, self._db:
+                self._db.executemany("INSERT INTO alarm_events VALUES (?, ?, ?, ?, ?)", events)
+                self._db.executemany("INSERT OR REPLACE INTO alarm_state VALUES (?, ?, ?)",
+                                     [(inverter_id, kind, mask) for (inverter_id, kind), mask in state.items()])
+        except sqlite3.Error:
+            # Keep the batch for the next flush.
+            with self._lock:
+                self._pending_events[:0] = events
+                for key, mask in state.items():
+                    self._pending_state.setdefault(key, mask)
+            raise
+
+    def query(self, inverter_id, start=None, end=None, kind=None, limit=1000):
+        """
+        Events of `inverter_id` with start <= ts < end (unix times, open-ended when
+        None), newest first, as (kind, flag, raised, ts) tuples. Uses the
+        (inverter_id, ts) index. Pending events are flushed first.
+        """
+        self.flush()
+        sql = "SELECT kind, flag, raised, ts FROM alarm_events WHERE inverter_id = ?"
+        params = [inverter_id]
+        if start is not None:
+            sql += " AND ts >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND ts < ?"
+            params.append(end)
+        if kind is not None:
+            sql += " AND kind = ?"
+            params.append(kind)
+        sql += " ORDER BY ts DESC LIMIT ?"
+        params.append(limit)
+        with self._db_lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Writing alarm events failed")
+
+
+@st.cache_resource(show_spinner=False)
+def get_alarm_log():
+    """Return the process-wide alarm event log."""
+    return AlarmLog(st.secrets.get("alarm_log", {}).get("path", ALARM_LOG_PATH))
@@ -0,0 +1,146 @@
+class AlarmMask:
+    """
+    Immutable set of triggered flags, backed by one Python int (bit i = flag i of the
+    catalog, least significant bit first), as stored in the `triggers` bytea columns.
+    Masks may be wider than 8 bits; the bytea is read big-endian like before.
+    """
+    __slots__ = ("value",)
+
+    def __init__(self, value=0):
+        object.__setattr__(self, "value", int(value))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("AlarmMask is immutable")
+
+    @classmethod
+    def from_hex(cls, hex_string):
+        """Parse a "\\xNN..." bytea string; None or an empty value is an empty mask."""
+        if not hex_string or len(hex_string) <= 2:
+            return cls(0)
+        return cls(int.from_bytes(bytes.fromhex(hex_string[2:]), byteorder="big"))
+
+    @classmethod
+    def from_flags(cls, triggered):
+        """Build a mask from an iterable of booleans, one per flag."""
+        value = 0
+        for i, flag in enumerate(triggered):
+            if flag:
+                value |= 1 << i
+        return cls(value)
+
+    def to_hex(self, width=8):
+        """Encode as a "\\xNN..." bytea string wide enough for `width` flags."""
+        nbytes = max(1, -(-max(width, self.value.bit_length()) // 8))
+        return "\\x" + self.value.to_bytes(nbytes, byteorder="big").hex()
+
+    def __contains__(self, index):
+        return bool((self.value >> index) & 1)
+
+    def __len__(self):
+        """Number of triggered flags."""
+        return self.value.bit_count()
+
+    def __iter__(self):
+        """Indices of the triggered flags, lowest first."""
+        value, index = self.value, 0
+        while value:
+            if value & 1:
+                yield index
+            value >>= 1
+            index += 1
+
+    def __xor__(self, other):
+        return AlarmMask(self.value ^ other.value)
+
+    def __and__(self, other):
+        return AlarmMask(self.value & other.value)
+
+    def __eq__(self, other):
+        return isinstance(other, AlarmMask) and self.value == other.value
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __int__(self):
+        return self.value
+
+    def __repr__(self):
+        return f"AlarmMask({self.value:#x})"
+
+
+class AlarmCatalog:
+    """
+    Fixed, ordered list of (flag, message) pairs; position i belongs to bit i of a mask.
+    Built once at import and never mutated.
+    """
+    __slots__ = ("flags", "messages", "_table")
+
+    def __init__(self, entries):
+        self.flags = tuple(flag for flag, _ in entries)
+        self.messages = tuple(message for _, message in entries)
+        self._table = None
+
+    def __len__(self):
+        return len(self.flags)
+
+    def table(self):
+        """The whole catalog as a ("Flag", "Message") DataFrame, built once and shared."""
+        if self._table is None:
+            import pandas as pd
+
+            self._table = pd.DataFrame({"Flag": self.flags, "Message": self.messages})
+        return self._table
+
+    def triggered(self, triggers):
+        """("Flag", "Message") rows of the flags set in one `triggers` value."""
+        return self.table()[decode_triggers([triggers], len(self))[0]]
+
+
+def decode_triggers(values, width):
+    """
+    Decode many `triggers` bytea strings at once.
+
+    Parameters:
+      values: sequence of "\\xNN..." strings (None counts as no flag triggered).
+      width: number of flags to decode.
+
+    Returns:
+      Boolean array of shape (len(values), width); [r, i] is flag i of value r.
+    """
+    import numpy as np
+
+    nbytes = max(1, -(-width // 8))
+    raw = []
+    for value in values:
+        data = bytes.fromhex(value[2:]) if value and len(value) > 2 else b""
+        # Big-endian bytea: keep the low-order `nbytes`, zero-pad shorter values on the left.
+        raw.append(data[-nbytes:].rjust(nbytes, b"\0"))
+    matrix = np.frombuffer(b"".join(raw), dtype=np.uint8).reshape(len(raw), nbytes)
+    # Reverse to little-endian byte order so bit i lands in column i.
+    bits = np.unpackbits(matrix[:, ::-1], axis=1, bitorder="little")
+    return bits[:, :width].astype(bool)
+
+
+def count_triggers(values, width):
+    """Number of triggered flags per value, as one array operation."""
+    return decode_triggers(values, width).sum(axis=1)
+
+
+# Flag catalogs, in bit order of the critical_alarms / maintenance_warnings triggers.
+CRITICAL_ALARMS = AlarmCatalog((
+    ('Battery Low Voltage', 'Attention! The battery voltage is critically low. Please take immediate action to prevent potential damage.'),
+    ('Low AC Output Voltage', 'Alert! The AC output voltage is currently below the acceptable level. This may affect the performance of connected devices.'),
+    ('High AC Output Load Power Percentage', 'Warning: High AC Output Load Power! Your system is experiencing a high load. The AC output power percentage has exceeded safe limits.'),
+    ('High Battery Discharging Current', 'Warning: High Battery Discharging Current! The battery is discharging at a high level. Please check the load conditions.'),
+    ('High Inverter Temperature', 'Warning: High Inverter Temperature! The inverter temperature is above safe levels. Check ventilation immediately.'),
+    ('Device Warning Status', 'Warning: Inverter Fault Detected! Check the system and consult the manual for troubleshooting.'),
+    ('High AC Output Frequency', 'Warning: High AC Output Frequency! The frequency is above normal levels. Please check the system.'),
+    ('Low AC Output Frequency', 'Warning: Low AC Output Frequency! The frequency is below the normal range. Please check inverter settings.'),
+))
+
+MAINTENANCE_WARNINGS = AlarmCatalog((
+    ('Full Discharge Cycle', 'Warning: Full Discharge Cycle Counted! A full discharge cycle has been completed. Monitor battery health and recharge as needed.'),
+    ('PV Cleaning Time', "Warning: PV Cleaning Required! It's time to clean the solar panels for optimal performance. Please schedule cleaning."),
+    ('Battery Check', "Warning: Battery Check Required! Please inspect the battery's condition and connections for safety."),
+    ('Total Statistics Display', 'Warning: Total Statistics Display Alert! The total statistics are available. Please review.'),
+))
@@ -0,0 +1,86 @@
+import threading
+import streamlit as st
+from cachetools import TTLCache
+from modules.query_metrics import timed_execute
+
+# Defaults, overridable from an [auth_cache] section in the secrets.
+DEFAULT_MAXSIZE = 2048   # cached identities per server process
+DEFAULT_TTL = 900        # seconds a cached identity stays valid
+
+
+class TokenCache:
+    """
+    Size-bounded TTL cache of browser identity -> (user_id, username).
+
+    Keys are ("access_token", token) or ("email", email), the two ways main() looks a
+    returning user up. Entries must be dropped with `invalidate_user()` whenever the
+    mapping may change: sign-out, account edits, password change and account deletion.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind, value):
+        with self._lock:
+            user = self._cache.get((kind, value))
+            if user is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return user
+
+    def put(self, kind, value, user_id, username):
+        with self._lock:
+            self._cache[(kind, value)] = (user_id, username)
+
+    def invalidate_user(self, user_id):
+        """Forget every cached identity that resolves to `user_id`."""
+        with self._lock:
+            for key in [k for k, (cached_id, _) in self._cache.items() if cached_id == user_id]:
+                del self._cache[key]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._cache),
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def get_token_cache():
+    """Return the process-wide identity cache."""
+    settings = st.secrets.get("auth_cache", {})
+    return TokenCache(maxsize=settings.get("maxsize", DEFAULT_MAXSIZE), ttl=settings.get("ttl", DEFAULT_TTL))
+
+
+def resolve_user(supabase, access_token=None, email=None):
+    """
+    Return (user_id, username) for a "remember me" access token or, failing that, an
+    email, hitting `user_authentication` only on a cache miss. None if not found.
+    """
+    if access_token:
+        kind, value = "access_token", access_token
+    elif email:
+        kind, value = "email", email
+    else:
+        return None
+
+    cache = get_token_cache()
+    user = cache.get(kind, value)
+    if user is not None:
+        return user
+
+    data = timed_execute(f"user_authentication.select_by_{kind}",
+                         supabase.table("user_authentication").select("id", "username").eq(kind, value))
+    if not data.data:
+        return None
+    user_id, username = data.data[0]["id"], data.data[0]["username"]
+    cache.put(kind, value, user_id, username)
+    return user_id, username
@@ -0,0 +1,168 @@
+import logging
+import threading
+import streamlit as st
+from modules.query_metrics import QUERY_PAGE, timed_execute
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable from a [commands] section in the secrets.
+DEFAULT_DEBOUNCE = 0.5       # seconds submissions for one inverter are gathered into one write
+DEFAULT_WRITE_TIMEOUT = 10   # seconds a session waits for its write to be confirmed
+COMMANDS_TABLE = "commands_state"
+# Set on every write so the inverter picks the new settings up; not a setting itself.
+CHANGE_FLAG = "cf"
+
+
+class CommandWriteError(RuntimeError):
+    """Raised when a commands_state write fails or is not confirmed by the database."""
+
+
+def _same(a, b):
+    # Columns mix text ("21.0", "01") and numbers (176 vs 176.0); compare numerically when both parse.
+    if isinstance(a, bool) or isinstance(b, bool):
+        return a == b
+    try:
+        return round(float(a), 3) == round(float(b), 3)
+    except (TypeError, ValueError):
+        return a == b
+
+
+def diff_command(current, desired):
+    """
+    Columns of `desired` whose value differs from the `current` commands_state row
+    (all of them when there is no row yet). The change flag is never part of the diff.
+    """
+    if current is None:
+        return {column: value for column, value in desired.items() if column != CHANGE_FLAG}
+    return {column: value for column, value in desired.items()
+            if column != CHANGE_FLAG and (column not in current or not _same(current[column], value))}
+
+
+class PendingWrite:
+    """One submission's share of a coalesced write; `wait()` returns the confirmed row."""
+    __slots__ = ("changes", "owner", "_done", "_row", "_error")
+
+    def __init__(self, changes, owner=None):
+        self.changes = changes
+        self.owner = owner
+        self._done = threading.Event()
+        self._row = None
+        self._error = None
+
+    def _resolve(self, row, error=None):
+        self._row, self._error = row, error
+        self._done.set()
+
+    def wait(self, timeout=DEFAULT_WRITE_TIMEOUT):
+        """The row as written (None if nothing changed); raises CommandWriteError."""
+        if not self._done.wait(timeout):
+            raise CommandWriteError("The inverter settings were not confirmed in time, please try again.")
+        if self._error is not None:
+            raise self._error
+        return self._row
+
+
+class CommandWriter:
+    """
+    Writes only the changed commands_state columns, and gathers the submissions for
+    one inverter that arrive within `debounce` seconds of the first into a single
+    write, so double clicks and quick successive saves don't make the firmware
+    re-apply the same settings. The write runs on a timer thread. A submission is
+    confirmed only if the written row holds every value it changed; one whose columns
+    another submitter overrode in the meantime gets a CommandWriteError.
+    """
+
+    def __init__(self, supabase, debounce=DEFAULT_DEBOUNCE, write_timeout=DEFAULT_WRITE_TIMEOUT):
+        self._supabase = supabase
+        self.debounce = debounce
+        self.write_timeout = write_timeout
+        self._lock = threading.Lock()
+        # inverter_id -> {"changes": {}, "owners": {column: owner}, "insert": bool, "waiters": [PendingWrite]}
+        self._pending = {}
+
+    def submit(self, inverter_id, current, desired, owner=None):
+        """
+        Queue the columns of `desired` that differ from `current`, the last known
+        commands_state row of the inverter (None if it has no row yet). `owner` (the
+        submitting session) lets a later submission of the same owner set a column it
+        queued itself back to the stored value; a column queued by someone else is
+        never dropped because this submission's form shows the stored value.
+        """
+        changes = diff_command(current, desired)
+        pending = PendingWrite(changes, owner)
+        with self._lock:
+            batch = self._pending.get(inverter_id)
+            if batch is None:
+                if not changes:
+                    pending._resolve(None)
+                    return pending
+                batch = self._pending[inverter_id] = {"changes": {}, "owners": {}, "insert": False, "waiters": []}
+                timer = threading.Timer(self.debounce, self._flush, (inverter_id,))
+                timer.daemon = True
+                timer.start()
+            reverted = False
+            for column, value in desired.items():
+                if column in changes:
+                    batch["changes"][column] = value
+                    batch["owners"][column] = owner
+                elif owner is not None and batch["owners"].get(column) == owner:
+                    del batch["changes"][column]
+                    del batch["owners"][column]
+                    reverted = True
+                else:
+                    continue
+                # The owner's earlier submissions no longer expect their value for this column.
+                for earlier in batch["waiters"]:
+                    if owner is not None and earlier.owner == owner:
+                        earlier.changes.pop(column, None)
+            if not changes and not reverted:
+                pending._resolve(None)
+                return pending
+            batch["insert"] |= current is None
+            batch["waiters"].append(pending)
+        return pending
+
+    def _flush(self, inverter_id):
+        QUERY_PAGE.set("Control & Commands")
+        with self._lock:
+            batch = self._pending.pop(inverter_id)
+        if not batch["changes"]:
+            for pending in batch["waiters"]:
+                pending._resolve(None)
+            return
+        values = dict(batch["changes"], **{CHANGE_FLAG: True})
+        row, error = None, None
+        try:
+            table = self._supabase.table(COMMANDS_TABLE)
+            if batch["insert"]:
+                query = table.upsert(dict(values, inverter_id=inverter_id), on_conflict=["inverter_id"])
+            else:
+                query = table.update(values).eq("inverter_id", inverter_id)
+            response = timed_execute("commands_state.write", query)
+            if response.data:
+                row = response.data[0]
+            else:
+                error = CommandWriteError("The inverter settings could not be saved, please try again.")
+        except Exception as e:
+            logger.warning("commands_state write for %s failed: %s", inverter_id, e)
+            error = CommandWriteError("The inverter settings could not be saved, please try again.")
+        finally:
+            # Every submitter hears back, whatever went wrong above.
+            if row is None and error is None:
+                error = CommandWriteError("The inverter settings could not be saved, please try again.")
+            for pending in batch["waiters"]:
+                if error is None and any(column not in row or not _same(row[column], value)
+                                         for column, value in pending.changes.items()):
+                    pending._resolve(None, CommandWriteError(
+                        "Someone else changed the same settings at the same time, please check them and save again."))
+                else:
+                    pending._resolve(row, error)
+        logger.debug("%s: wrote %d column(s) for %d submission(s)", inverter_id, len(values), len(batch["waiters"]))
+
+
+@st.cache_resource(show_spinner=False)
+def get_command_writer(_supabase):
+    """Return the process-wide command writer, so submissions from all sessions coalesce."""
+    settings = st.secrets.get("commands", {})
+    return CommandWriter(_supabase, debounce=settings.get("debounce", DEFAULT_DEBOUNCE),
+                         write_timeout=settings.get("write_timeout", DEFAULT_WRITE_TIMEOUT))
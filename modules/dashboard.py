@@ -1,9 +1,12 @@
 import streamlit as st
 from PIL import Image
 import modules.js_utils as js_utils
-from modules.navigation import overview, commands, alarms, account
-from modules.utils import get_from_database, get_from_alarms
-import time
+from modules.auth_cache import get_token_cache
+from modules.navigation import overview, commands, alarms, account, fleet, alarm_history
+from modules.poller import get_poller, current_session_id
+from modules.payload_meter import measure_payload
+from modules.query_metrics import QUERY_STATS, query_page, timed_execute
+from modules.profiler import STAGE_TIMINGS, profiled, request_capture, capture_status, capture_dump, capture_summary
 import os
 
 
@@ -28,10 +31,15 @@ selected_columns = ['grid_voltage_input', 'grid_frequency_input',
                     'battery_discharging_current', 'inverter_temperature',
                     'pv_input_voltage', 'pv_input_current',
                     'pv_input_power']
+# Seconds between two redraws of the Overview fragment (reads memory only, no queries).
+OVERVIEW_REFRESH = 2
+# Seconds between two redraws of the admin diagnostics panel.
+DIAGNOSTICS_REFRESH = 5
 # -------------------------------------
 # Dashboard Layout and Navigation
 # -------------------------------------
 
+@profiled("dashboard")
 def dashboard(user_id, username, supabase):
     if "Account_Page" not in st.session_state:
         st.session_state["Account_Page"] = False
@@ -49,12 +57,13 @@ def dashboard(user_id, username, supabase):
         # Navigation menu
         with st.expander("Navigation", icon="📃"):
             if 'navigation' not in st.session_state:
-                st.session_state['navagation'] = ["Overview", "Control & Commands", "Alarms & Warnings"]           
+                st.session_state['navagation'] = ["Overview", "Control & Commands", "Alarms & Warnings", "Fleet Overview", "Alarm History"]           
             choice = st.radio("", st.session_state['navagation'], index=0)
 
-        with st.expander("Filters", icon="⚡️"):
+        with st.expander("Filters", icon="⚡️"), query_page("Sidebar"):
             # Filter the data displayed in the dashboard further
-            data = supabase.table("company_inverters").select("inverter_id").eq("user_id", user_id).execute()
+            data = timed_execute("company_inverters.select_by_user",
+                                 supabase.table("company_inverters").select("inverter_id").eq("user_id", user_id))
             inverter_ids = [item["inverter_id"] for item in data.data]
             device_filter = st.selectbox("Select Inverter", options=inverter_ids)
 
@@ -63,13 +72,17 @@ def dashboard(user_id, username, supabase):
             if Account_button:
                 st.session_state["Account_Page"] = True
             if st.button(":unlock: Sign Out", use_container_width=True):
-                # Clear sign-in flags and tokens.
-                js_utils.save_to_storage("sessionStorage", "is_signed", False)
-                js_utils.save_to_storage("sessionStorage", "user_email", "")
-                js_utils.save_to_storage("localStorage", "access_token", "")
-                js_utils.refresh()  # Force a browser-level refresh via JS helper.
+                get_token_cache().invalidate_user(user_id)
+                # Clear sign-in flags and tokens and refresh the browser in one JS round trip.
+                js_utils.save_many([("sessionStorage", "is_signed", False),
+                                    ("sessionStorage", "user_email", ""),
+                                    ("localStorage", "access_token", "")], reload=True)
                 st.rerun()
 
+        if user_id in st.secrets.get("diagnostics", {}).get("admins", []):
+            with st.expander("Diagnostics", icon="🩺"):
+                diagnostics_panel()
+
         st.markdown("### Contact & Support")
         st.info("Email: solsync-support@proton.me")
         st.markdown("© 2025 SolSync")
@@ -77,29 +90,132 @@ def dashboard(user_id, username, supabase):
     # -------------------------------
     # MAIN CONTENT (depending on sidebar choice)
     # -------------------------------
+    poller = get_poller(supabase, tuple(selected_columns))
+    on_overview = not st.session_state["Account_Page"] and choice == st.session_state['navagation'][0]
+    if not on_overview:
+        # Stop receiving snapshots as soon as the user leaves the Overview page.
+        poller.unsubscribe(current_session_id())
+
     data_placeholder = st.empty()
-    with data_placeholder:
+    with data_placeholder, query_page("Account" if st.session_state["Account_Page"] else choice):
         if st.session_state["Account_Page"]:
             with data_placeholder.container():
                 # Create a placeholder for the text box where data will be refreshed
                 account(supabase, user_id, inverter_ids)
         elif choice == st.session_state['navagation'][0]:
-            last_param = get_from_database(supabase, user_id, device_filter)
-            while True:
-                with data_placeholder.container():
-                    parameters = get_from_database(supabase, user_id, device_filter)
-                    delta = parameters[selected_columns] - last_param[selected_columns]
-                    AL1 = get_from_alarms(supabase, device_filter, "critical_alarms")
-                    AL2 = get_from_alarms(supabase, device_filter, "maintenance_warnings")
-                    overview(parameters, delta, AL1, AL2)
-                    last_param[selected_columns] = parameters[selected_columns]
-                    time.sleep(10)
+            with data_placeholder.container():
+                # A full run always redraws; the fragment's ticks only on a new snapshot.
+                st.session_state.pop("overview_rendered", None)
+                live_overview(supabase, user_id, device_filter, st.empty())
         elif choice == st.session_state['navagation'][1]:
             with data_placeholder.container():
                 commands(supabase, device_filter)
         elif choice == st.session_state['navagation'][2]:
             with data_placeholder.container():
-                alarms(supabase, device_filter)
+                alarms(supabase, user_id, device_filter)
+        elif choice == st.session_state['navagation'][3]:
+            with data_placeholder.container():
+                fleet(supabase, inverter_ids, selected_columns)
+        elif choice == st.session_state['navagation'][4]:
+            with data_placeholder.container():
+                alarm_history(device_filter)
+
+
+@st.fragment(run_every=OVERVIEW_REFRESH)
+def live_overview(supabase, user_id, device_filter, view):
+    """
+    Self-refreshing Overview metrics. Only this fragment reruns on every tick, so the
+    sidebar, the inverter query and the authentication in main() run once per user
+    interaction. Data comes from the shared poller's in-memory snapshot.
+
+    The metrics are drawn into `view`, a placeholder created outside the fragment:
+    a fragment rerun clears the elements of its own body it did not send again, but
+    leaves outside ones alone. A tick whose snapshot version was already drawn only
+    renews the subscription and sends nothing.
+    """
+    poller = get_poller(supabase, tuple(selected_columns))
+    # Subscribing on every tick also renews this session's lease.
+    poller.subscribe(current_session_id(), user_id, device_filter)
+    snapshot = poller.latest(device_filter)
+    if snapshot is None:
+        # The first fetch of a newly watched inverter is still in flight. Don't block the
+        # session's script thread on it (clicks would queue behind); the next tick draws it.
+        st.session_state.pop("overview_rendered", None)
+        view.info("Waiting for inverter data...")
+        return
+    rendered = (device_filter, snapshot.version)
+    if st.session_state.get("overview_rendered") == rendered:
+        return
+    st.session_state["overview_rendered"] = rendered
+    # `[overview] renderer = "native"` switches back to one st.metric per value.
+    settings = st.secrets.get("overview", {})
+    with view.container():
+        with measure_payload("overview") as payload:
+            overview(snapshot.parameters, snapshot.delta, snapshot.critical, snapshot.maintenance,
+                     poller.history(device_filter), renderer=settings.get("renderer", "html"),
+                     history_columns=poller.columns)
+        if settings.get("show_payload", False):
+            st.caption(f"This refresh sent {payload.messages} messages, {payload.bytes / 1024:.1f} KB")
+
+
+@st.fragment(run_every=DIAGNOSTICS_REFRESH)
+def diagnostics_panel():
+    """
+    Wall and CPU time per render stage and backend time per page and per query, for
+    this server process (all sessions), the identity cache's hit rate, with the query
+    numbers in the Prometheus text format and a cProfile capture of this session's
+    next reruns. Shown to the user ids listed in `[diagnostics] admins` in the secrets.
+    """
+    stages = STAGE_TIMINGS.report()
+    if stages:
+        st.dataframe(stages, hide_index=True, use_container_width=True,
+                     column_config={"wall_p50_ms": st.column_config.NumberColumn("Wall p50 ms", format="%.0f"),
+                                    "wall_p95_ms": st.column_config.NumberColumn("Wall p95 ms", format="%.0f"),
+                                    "cpu_p50_ms": st.column_config.NumberColumn("CPU p50 ms", format="%.0f"),
+                                    "cpu_share": st.column_config.ProgressColumn("CPU share", min_value=0,
+                                                                                 max_value=1, format="%.2f")})
+    cache = get_token_cache().stats()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Identity hits", cache["hits"])
+    col2.metric("Identity misses", cache["misses"])
+    col3.metric("Hit rate", f"{cache['hit_rate']:.0%}")
+    col4.metric("Cached identities", cache["size"])
+    report = QUERY_STATS.report()
+    if report:
+        pages = sorted(QUERY_STATS.by_page().items(), key=lambda item: item[1], reverse=True)
+        st.dataframe([{"page": page, "backend_s": seconds} for page, seconds in pages], hide_index=True,
+                     use_container_width=True,
+                     column_config={"backend_s": st.column_config.NumberColumn("Backend s", format="%.2f")})
+        st.dataframe(report, hide_index=True, use_container_width=True,
+                     column_config={"total_ms": st.column_config.NumberColumn("Total ms", format="%.0f"),
+                                    "avg_ms": st.column_config.NumberColumn("Avg ms", format="%.1f"),
+                                    "max_ms": st.column_config.NumberColumn("Max ms", format="%.1f"),
+                                    "kb": st.column_config.NumberColumn("KB", format="%.1f")})
+    else:
+        st.caption("No queries recorded yet.")
+    col1, col2 = st.columns(2)
+    col1.download_button("Prometheus", QUERY_STATS.prometheus(), file_name="solsync_queries.prom",
+                         mime="text/plain", use_container_width=True)
+    if col2.button("Reset", use_container_width=True):
+        QUERY_STATS.reset()
+        STAGE_TIMINGS.reset()
+        st.rerun(scope="fragment")
+
+    st.markdown("##### cProfile")
+    capture = capture_status()
+    if capture and capture["remaining"] > 0:
+        st.caption(f"Profiling this session: {capture['remaining']} rerun(s) left")
+    reruns = st.number_input("Reruns to profile", min_value=1, max_value=50, value=5)
+    if st.button("Profile next reruns", use_container_width=True):
+        request_capture(reruns)
+        # A full rerun, so the capture starts right away.
+        st.rerun()
+    if capture and capture["stats"] is not None and capture["remaining"] == 0:
+        st.download_button(f"Download .prof ({capture['reruns']} reruns)", capture_dump(capture),
+                           file_name="solsync_reruns.prof", mime="application/octet-stream",
+                           use_container_width=True)
+        if st.toggle("Top functions"):
+            st.code(capture_summary(capture), language=None)
 
 # For demonstration, you might call the dashboard like so:
 if __name__ == "__main__":
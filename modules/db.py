@@ -0,0 +1,94 @@
+import httpx
+import streamlit as st
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient as PostgrestSession
+from supabase import Client, ClientOptions
+
+# Connection pool and timeout settings, overridable from a [db] section in the secrets.
+DEFAULT_DB_SETTINGS = {
+    "http2": True,                    # multiplex concurrent queries over one TLS connection
+    "max_connections": 20,            # upper bound of open connections per process
+    "max_keepalive_connections": 10,  # idle connections kept warm between reruns
+    "keepalive_expiry": 60.0,         # seconds an idle connection stays in the pool
+    "connect_timeout": 5.0,
+    "read_timeout": 10.0,
+    "write_timeout": 10.0,
+    "pool_timeout": 5.0,              # seconds to wait for a free connection
+}
+
+
+class PooledPostgrestClient(SyncPostgrestClient):
+    """PostgREST client whose HTTP session uses explicit pool limits."""
+
+    def __init__(self, base_url, *, limits, http2, **kwargs):
+        self._limits = limits
+        self._http2 = http2
+        super().__init__(base_url, **kwargs)
+
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+        return PostgrestSession(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            verify=verify,
+            proxy=proxy,
+            follow_redirects=True,
+            http2=self._http2,
+            limits=self._limits,
+        )
+
+
+class PooledClient(Client):
+    """
+    Supabase client that keeps one pooled, keep-alive HTTP/2 session for all
+    `table(...)` and `rpc(...)` calls, shared by every Streamlit session.
+    """
+    settings = DEFAULT_DB_SETTINGS
+
+    def _init_postgrest_client(self, rest_url, headers, schema, timeout=None, verify=True, proxy=None):
+        return PooledPostgrestClient(
+            rest_url,
+            headers=headers,
+            schema=schema,
+            timeout=timeout,
+            verify=verify,
+            proxy=proxy,
+            limits=httpx.Limits(
+                max_connections=self.settings["max_connections"],
+                max_keepalive_connections=self.settings["max_keepalive_connections"],
+                keepalive_expiry=self.settings["keepalive_expiry"],
+            ),
+            http2=self.settings["http2"],
+        )
+
+
+def create_pooled_client(url, key, settings=None):
+    settings = dict(DEFAULT_DB_SETTINGS, **(settings or {}))
+    timeout = httpx.Timeout(
+        connect=settings["connect_timeout"],
+        read=settings["read_timeout"],
+        write=settings["write_timeout"],
+        pool=settings["pool_timeout"],
+    )
+    client = PooledClient.create(url, key, ClientOptions(postgrest_client_timeout=timeout))
+    # The PostgREST client is built lazily on first use, so the settings still apply.
+    client.settings = settings
+    return client
+
+
+# No spinner: main.py builds the client before st.set_page_config() runs.
+@st.cache_resource(show_spinner=False)
+def get_client():
+    """
+    Return the process-wide Supabase client. It is created once per server process,
+    so reruns, new sessions and hot reloads reuse the same warm connection pool.
+
+    With a `[fake_backend]` section in the secrets (and no `enabled = false` in it),
+    an in-process stand-in with synthetic data is returned instead; see
+    devtools/fake_supabase.py.
+    """
+    fake = st.secrets.get("fake_backend")
+    if fake is not None and fake.get("enabled", True):
+        from devtools.fake_supabase import create_fake_client
+        return create_fake_client(fake)
+    return create_pooled_client(st.secrets.url, st.secrets.anon_key, st.secrets.get("db", {}))
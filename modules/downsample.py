@@ -0,0 +1,89 @@
+import numpy as np
+
+# Points a chart trace is reduced to; keeps the browser payload bounded whatever the range.
+MAX_CHART_POINTS = 1000
+
+
+def minmax_indices(y, n_out):
+    """
+    Indices of the minimum and maximum of `y` in each of n_out // 2 equal buckets, plus
+    the first and last point. Every local extreme survives, so spikes stay visible.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    buckets = max(1, (n_out - 2) // 2)
+    size = -(-n // buckets)
+    buckets = -(-n // size)
+    # Pad to a (buckets, size) grid; padding and NaNs never win argmin/argmax.
+    lows = np.full(buckets * size, np.inf)
+    highs = np.full(buckets * size, -np.inf)
+    lows[:n] = np.where(np.isnan(y), np.inf, y)
+    highs[:n] = np.where(np.isnan(y), -np.inf, y)
+    offsets = np.arange(buckets) * size
+    picked = np.concatenate((
+        offsets + lows.reshape(buckets, size).argmin(axis=1),
+        offsets + highs.reshape(buckets, size).argmax(axis=1),
+        [0, n - 1],
+    ))
+    return np.unique(np.minimum(picked, n - 1))
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: per bucket, the point spanning the largest triangle
+    with the previously kept point and the mean of the next bucket. Looks closest to
+    the full line, but unlike min/max a spike can lose to a wider neighbour.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    n = len(y)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    picked = np.empty(n_out, dtype=int)
+    picked[0], picked[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[stop:next_stop].mean()
+        next_y = y[stop:next_stop].mean()
+        # Twice the triangle area for every candidate of the bucket at once.
+        area = np.abs((x[previous] - next_x) * (y[start:stop] - y[previous])
+                      - (x[previous] - x[start:stop]) * (next_y - y[previous]))
+        previous = start + int(area.argmax())
+        picked[i + 1] = previous
+    return picked
+
+
+def downsample(x, y, max_points=MAX_CHART_POINTS, method="minmax"):
+    """
+    Reduce a series to at most `max_points` points for plotting.
+
+    Parameters:
+      x: x values (numbers, datetimes or labels); only used for spacing by "lttb" when numeric.
+      y: y values.
+      max_points: target size, at least 4 (first, last and one bucket's min and max);
+        shorter series are returned unchanged.
+      method: "minmax" (keeps every peak, the default) or "lttb".
+
+    Returns:
+      (x, y) of the kept points, as lists when the input were lists.
+    """
+    if max_points is not None and max_points < 4:
+        raise ValueError(f"max_points must be at least 4, got {max_points}")
+    n = len(y)
+    if max_points is None or n <= max_points:
+        return x, y
+    if method == "lttb":
+        x_arr = np.asarray(x)
+        spacing = x_arr.astype(float) if np.issubdtype(x_arr.dtype, np.number) else np.arange(n)
+        idx = lttb_indices(spacing, y, max_points)
+    elif method == "minmax":
+        idx = minmax_indices(y, max_points)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method!r}")
+    x_out, y_out = np.asarray(x)[idx], np.asarray(y)[idx]
+    if isinstance(x, list):
+        x_out = x_out.tolist()
+    if isinstance(y, list):
+        y_out = y_out.tolist()
+    return x_out, y_out
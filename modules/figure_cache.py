@@ -0,0 +1,47 @@
+import threading
+from collections import OrderedDict
+import streamlit as st
+
+# Figures kept per server process (two per inverter with statistics).
+FIGURE_CACHE_SIZE = 256
+
+
+class FigureCache:
+    """
+    LRU cache of built Plotly figures as plain dicts, ready for `st.plotly_chart`.
+
+    Keys identify the data a figure was built from, e.g. ("power", inverter_id,
+    statistics_ready_date); a new statistics date simply becomes a new key and the old
+    entry ages out.
+    """
+
+    def __init__(self, maxsize=FIGURE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build):
+        """Return the dict of the figure under `key`, calling `build()` only on a miss."""
+        with self._lock:
+            spec = self._figures.get(key)
+            if spec is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return spec
+            self.misses += 1
+        spec = build().to_dict()
+        with self._lock:
+            self._figures[key] = spec
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.maxsize:
+                self._figures.popitem(last=False)
+        return spec
+
+
+@st.cache_resource(show_spinner=False)
+def get_figure_cache():
+    """Return the process-wide figure cache."""
+    return FigureCache()
+
@@ -0,0 +1,103 @@
+import warnings
+import numpy as np
+import pandas as pd
+import streamlit as st
+from modules.utils import TELEMETRY_TABLE
+from modules.alarms import CRITICAL_ALARMS, MAINTENANCE_WARNINGS, count_triggers
+from modules.query_metrics import timed_execute
+
+# Inverter ids per `in_` filter; keeps the request URL well under PostgREST limits.
+FLEET_CHUNK = 200
+# Robust z-score above which a unit's value is flagged as an outlier.
+OUTLIER_THRESHOLD = 3.5
+# Seconds the fleet telemetry stays cached (same cadence as the Overview poller).
+FLEET_TTL = 10
+
+
+@st.cache_data(ttl=FLEET_TTL, show_spinner=False)
+def get_fleet_telemetry(_supabase, inverter_ids, columns):
+    """
+    Fetch the latest telemetry row of every inverter in `inverter_ids` with `in_`
+    filters (one query per FLEET_CHUNK ids) instead of one RPC per inverter.
+    """
+    inverter_ids = list(inverter_ids)
+    fields = ["inverter_id", "online", "updated_at", *columns]
+    rows = []
+    for start in range(0, len(inverter_ids), FLEET_CHUNK):
+        chunk = inverter_ids[start:start + FLEET_CHUNK]
+        response = timed_execute("fleet.telemetry",
+                                 _supabase.table(TELEMETRY_TABLE).select(*fields).in_("inverter_id", chunk))
+        rows.extend(response.data)
+    return pd.DataFrame(rows, columns=fields)
+
+
+@st.cache_data(ttl=FLEET_TTL, show_spinner=False)
+def get_fleet_alarm_counts(_supabase, inverter_ids):
+    """
+    Number of active critical alarms and maintenance warnings per inverter: the
+    `triggers` of the whole fleet are fetched in FLEET_CHUNK batches and decoded in
+    one array operation per table.
+
+    Returns:
+      DataFrame with "inverter_id", "Alarms" and "Warnings".
+    """
+    inverter_ids = list(inverter_ids)
+    counts = pd.DataFrame({"inverter_id": inverter_ids})
+    for table, catalog, label in (("critical_alarms", CRITICAL_ALARMS, "Alarms"),
+                                  ("maintenance_warnings", MAINTENANCE_WARNINGS, "Warnings")):
+        triggers = {}
+        for start in range(0, len(inverter_ids), FLEET_CHUNK):
+            chunk = inverter_ids[start:start + FLEET_CHUNK]
+            response = timed_execute(f"fleet.{table}",
+                                     _supabase.table(table).select("inverter_id", "triggers").in_("inverter_id", chunk))
+            triggers.update((row["inverter_id"], row["triggers"]) for row in response.data)
+        counts[label] = count_triggers([triggers.get(i) for i in inverter_ids], len(catalog))
+    return counts
+
+
+def summarize_fleet(telemetry, columns):
+    """
+    Compute fleet-wide statistics and per-unit outliers in one vectorized pass.
+
+    Parameters:
+      telemetry: DataFrame with one row per inverter ("inverter_id", "online" and `columns`).
+      columns: the numeric telemetry columns to aggregate.
+
+    Returns:
+      summary: DataFrame indexed by column with Total, Mean, Min and Max.
+      units: the telemetry with an "Outliers" count and the names of the flagged columns.
+    """
+    columns = list(columns)
+    values = telemetry[columns].to_numpy(dtype=float)
+
+    if len(values):
+        # Columns no inverter reports are all NaN; their statistics stay NaN quietly.
+        with warnings.catch_warnings(), np.errstate(divide="ignore", invalid="ignore"):
+            warnings.simplefilter("ignore", RuntimeWarning)
+            reported = ~np.isnan(values).all(axis=0)
+            totals = np.where(reported, np.nansum(values, axis=0), np.nan)
+            means = np.nanmean(values, axis=0)
+            mins = np.nanmin(values, axis=0)
+            maxs = np.nanmax(values, axis=0)
+            # Robust z-score (median / median absolute deviation) so a few broken units
+            # don't hide themselves by inflating the spread. When more than half the fleet
+            # reports the same value the MAD is 0; the mean absolute deviation stands in then.
+            medians = np.nanmedian(values, axis=0)
+            deviations = np.abs(values - medians)
+            mad = np.nanmedian(deviations, axis=0)
+            mean_ad = np.nanmean(deviations, axis=0)
+            z = np.where(mad > 0, 0.6745 * (values - medians) / mad,
+                         (values - medians) / (1.2533 * mean_ad))
+        outliers = np.nan_to_num(np.abs(z)) > OUTLIER_THRESHOLD
+    else:
+        totals = means = mins = maxs = np.full(len(columns), np.nan)
+        outliers = np.zeros((0, len(columns)), dtype=bool)
+
+    summary = pd.DataFrame({"Total": totals, "Mean": means, "Min": mins, "Max": maxs}, index=columns)
+
+    units = telemetry.copy()
+    units["Outliers"] = outliers.sum(axis=1)
+    # Boolean matrix times column labels concatenates the flagged names per row.
+    labels = pd.DataFrame(outliers, columns=columns, index=telemetry.index).dot(pd.Index(columns) + ", ")
+    units["Outlier metrics"] = labels.str.rstrip(", ") if len(units) else labels
+    return summary, units
@@ -0,0 +1,81 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+
+# Defaults, overridable from a [hashing] section in the secrets.
+DEFAULT_ROUNDS = 12         # bcrypt work factor (log2 of the iterations)
+DEFAULT_WORKERS = 2         # bcrypt calls running at once, i.e. cores hashing may occupy
+DEFAULT_MAX_PENDING = 32    # queued + running jobs before new ones are turned away
+DEFAULT_QUEUE_TIMEOUT = 10  # seconds a caller waits for a queue slot
+
+
+class HashingBusy(RuntimeError):
+    """Raised when the hashing queue stays full for longer than the queue timeout."""
+
+
+def bcrypt_cost(hashed_value):
+    """Work factor of a "$2b$12$..." bcrypt hash, or None if it can't be read."""
+    parts = hashed_value.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class Hasher:
+    """
+    Runs bcrypt on a small dedicated thread pool instead of the Streamlit script thread.
+
+    bcrypt releases the GIL, so a burst of logins only ever occupies `workers` cores and
+    the other sessions keep rendering. At most `max_pending` jobs are queued or running;
+    past that, callers wait up to `queue_timeout` seconds for a slot and then get
+    `HashingBusy`, so a flood can't grow the queue without bound.
+    """
+
+    def __init__(self, rounds=DEFAULT_ROUNDS, workers=DEFAULT_WORKERS,
+                 max_pending=DEFAULT_MAX_PENDING, queue_timeout=DEFAULT_QUEUE_TIMEOUT):
+        self.rounds = rounds
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise HashingBusy("Too many sign-in attempts at once, please try again shortly.")
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, value):
+        """Hash `value` with the configured work factor; returns the hash as a string."""
+        import bcrypt
+
+        return self._run(lambda: bcrypt.hashpw(value.encode("utf-8"), bcrypt.gensalt(self.rounds)).decode("utf-8"))
+
+    def verify(self, plain_value, hashed_value):
+        """True if `plain_value` matches `hashed_value`."""
+        import bcrypt
+
+        return self._run(bcrypt.checkpw, plain_value.encode("utf-8"), hashed_value.encode("utf-8"))
+
+    def needs_rehash(self, hashed_value):
+        """True if `hashed_value` was made with a different work factor than the configured one."""
+        return bcrypt_cost(hashed_value) != self.rounds
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+@st.cache_resource(show_spinner=False)
+def get_hasher():
+    """Return the process-wide hasher; all sessions share its worker threads."""
+    settings = st.secrets.get("hashing", {})
+    return Hasher(
+        rounds=settings.get("rounds", DEFAULT_ROUNDS),
+        workers=settings.get("workers", DEFAULT_WORKERS),
+        max_pending=settings.get("max_pending", DEFAULT_MAX_PENDING),
+        queue_timeout=settings.get("queue_timeout", DEFAULT_QUEUE_TIMEOUT),
+    )
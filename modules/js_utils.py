@@ -1,3 +1,4 @@
+import json
 import streamlit_js_eval as js_eval
 from streamlit_js_eval import streamlit_js_eval
 
@@ -40,4 +41,42 @@ def load_from_local_storage(key: str):
       The retrieved string (or None) from localStorage.
     """
     js_expr = f'localStorage.getItem("{key}")'
-    return js_eval.streamlit_js_eval(js_expressions=js_expr, key=f"load_localStorage_{key}")
\ No newline at end of file
+    return js_eval.streamlit_js_eval(js_expressions=js_expr, key=f"load_localStorage_{key}")
+
+def load_many(items):
+    """
+    Load several keys from browser storage in one component round trip.
+
+    Parameters:
+      items: list of (storage_type, key) tuples, storage_type being
+             "sessionStorage" or "localStorage".
+
+    Returns:
+      A dict {key: value-or-None}, or None while the browser has not answered yet
+      (the component triggers a rerun as soon as it does).
+    """
+    js_expr = "JSON.stringify({" + ", ".join(
+        f'{json.dumps(key)}: {storage_type}.getItem({json.dumps(key)})' for storage_type, key in items
+    ) + "})"
+    raw = js_eval.streamlit_js_eval(js_expressions=js_expr,
+                                    key="load_many_" + "_".join(key for _, key in items))
+    if raw is None:
+        return None
+    return json.loads(raw)
+
+def save_many(items, reload=False):
+    """
+    Save several values into browser storage in one component round trip.
+
+    Parameters:
+      items: list of (storage_type, key, value) tuples; booleans are stored as 'true'/'false'.
+      reload: also reload the page in the same round trip (e.g. after sign-out).
+    """
+    statements = []
+    for storage_type, key, value in items:
+        value_str = str(value).lower() if isinstance(value, bool) else str(value)
+        statements.append(f'{storage_type}.setItem({json.dumps(key)}, {json.dumps(value_str)})')
+    if reload:
+        statements.append("parent.window.location.reload()")
+    _ = js_eval.streamlit_js_eval(js_expressions="; ".join(statements),
+                                  key="save_many_" + "_".join(key for _, key, _ in items))
@@ -0,0 +1,68 @@
+from html import escape
+
+# Overview sections: (title, ((column, label, unit), ...)), same layout as the st.metric version.
+METRIC_SECTIONS = (
+    ("Grid", (
+        ("grid_voltage_input", "Grid Voltage", "V"),
+        ("grid_frequency_input", "Grid Frequency", "Hz"),
+        ("inverter_temperature", "Inverter Temperature", "°C"),
+    )),
+    ("AC Output", (
+        ("ac_output_voltage", "AC Output Voltage", "V"),
+        ("ac_output_frequency", "AC Output Frequency", "Hz"),
+        ("ac_output_apparent_power", "AC Output Apparent Power", "VA"),
+        ("ac_output_active_power", "AC Output Active Power", "W"),
+        ("ac_output_power_percentage", "AC Output Power Percentage", "%"),
+    )),
+    ("Battery", (
+        ("battery_voltage", "Battery Voltage", "V"),
+        ("battery_charging_current", "Battery Charging Current", "A"),
+        ("battery_charging_power", "Battery Charging Power", "W"),
+        ("battery_discharging_current", "Battery Discharging Current", "A"),
+    )),
+    ("Photovoltaic", (
+        ("pv_input_voltage", "PV Input Voltage", "V"),
+        ("pv_input_current", "PV Input Current", "A"),
+        ("pv_input_power", "PV Input Power", "W"),
+    )),
+)
+
+# Looks like bordered st.metric cards; text inherits the theme's color, so light and dark themes both work.
+GRID_CSS = """
+<style>
+.ss-section { font-size: 2.25rem; font-weight: 700; margin: 1rem 0 0.5rem; }
+.ss-row { display: grid; gap: 1rem; }
+.ss-card { border: 1px solid rgba(128, 128, 128, 0.3); border-radius: 0.5rem; padding: 1rem; }
+.ss-label { font-size: 0.875rem; color: inherit; opacity: 0.8; }
+.ss-value { font-size: 2.25rem; line-height: 1.3; }
+.ss-delta { font-size: 1rem; }
+.ss-up { color: rgb(9, 171, 59); }
+.ss-down { color: rgb(255, 43, 43); }
+.ss-rule { border: none; border-top: 1px solid rgba(128, 128, 128, 0.3); margin: 1.5rem 0; }
+</style>
+"""
+
+
+def metric_grid_html(data_table, delta, sections=METRIC_SECTIONS):
+    """
+    The Overview metric sections as one HTML string, so they reach the browser as a
+    single element instead of one container, column and metric per value.
+
+    `data_table` and `delta` are TelemetryVectors (column lookup by name).
+    """
+    parts = [GRID_CSS]
+    for n, (title, metrics) in enumerate(sections):
+        if n:
+            parts.append('<hr class="ss-rule">')
+        parts.append(f'<div class="ss-section">{escape(title)}</div>')
+        parts.append(f'<div class="ss-row" style="grid-template-columns: repeat({len(metrics)}, 1fr)">')
+        for column, label, unit in metrics:
+            change = delta[column]
+            arrow, css = ("↓", "ss-down") if change < 0 else ("↑", "ss-up")
+            parts.append(
+                f'<div class="ss-card"><div class="ss-label">{escape(label)}</div>'
+                f'<div class="ss-value">{data_table[column]:.2f} {escape(unit)}</div>'
+                f'<div class="ss-delta {css}">{arrow} {abs(change):.2f} {escape(unit)}</div></div>'
+            )
+        parts.append('</div>')
+    return "".join(parts)
@@ -1,14 +1,50 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 from datetime import datetime, timedelta, timezone
 import modules.utils as utils
 import modules.js_utils as js_utils
+import modules.fleet as fleet_utils
+from modules.alarms import AlarmMask, CRITICAL_ALARMS, MAINTENANCE_WARNINGS
+from modules.alarm_log import get_alarm_log
+from modules.auth_cache import get_token_cache
+from modules.figure_cache import get_figure_cache
+from modules.metric_grid import metric_grid_html
+from modules.query_metrics import timed_execute
+from modules.profiler import profiled
+from modules.command_writer import CommandWriteError, get_command_writer
+from modules.poller import current_session_id
+from modules.hashing import HashingBusy
 from time import sleep
 from postgrest.exceptions import APIError
 
-def overview(data_table, delta, AL1, AL2):
-    utc_time = datetime.fromisoformat(data_table.updated_at[0])
+# Label and unit of every telemetry column shown in the trends table.
+TREND_LABELS = {
+    'grid_voltage_input': ("Grid Voltage", "V"),
+    'grid_frequency_input': ("Grid Frequency", "Hz"),
+    'ac_output_voltage': ("AC Output Voltage", "V"),
+    'ac_output_frequency': ("AC Output Frequency", "Hz"),
+    'ac_output_apparent_power': ("AC Output Apparent Power", "VA"),
+    'ac_output_active_power': ("AC Output Active Power", "W"),
+    'ac_output_power_percentage': ("AC Output Power Percentage", "%"),
+    'battery_voltage': ("Battery Voltage", "V"),
+    'battery_charging_current': ("Battery Charging Current", "A"),
+    'battery_charging_power': ("Battery Charging Power", "W"),
+    'battery_discharging_current': ("Battery Discharging Current", "A"),
+    'inverter_temperature': ("Inverter Temperature", "°C"),
+    'pv_input_voltage': ("PV Input Voltage", "V"),
+    'pv_input_current': ("PV Input Current", "A"),
+    'pv_input_power': ("PV Input Power", "W"),
+}
+# Samples in the rolling average of the trends table (one minute at the 10 s poll interval).
+ROLLING_SAMPLES = 6
+
+@profiled("overview")
+def overview(data_table, delta, critical, maintenance, history=None, renderer="html", history_columns=None):
+    # data_table and delta are TelemetryVectors (see modules/telemetry.py): column by name.
+    # history_columns names the columns of the history's values (the poller's columns).
+    utc_time = datetime.fromisoformat(data_table.updated_at)
     # Define GMT+3 timezone
     gmt_plus_three = timezone(timedelta(hours=3))
     # Convert UTC time to GMT+3
@@ -22,83 +58,122 @@ def overview(data_table, delta, AL1, AL2):
         col1, col2, col3, col4, col5, col6, col7, col8 = st.columns([1.2, 2, 1, 2, 1.1, 2, 1.2, 2], vertical_alignment="center")
         col1.write("**Inverter Status:**")
         with col2:
-            if data_table.online[0]:
+            if data_table.online:
                 st.success("Online")
             else:
                 st.error("Offline")
         col3.write("**Mode:**")
         with col4:
-            if data_table.device_status[0] == "P":
+            if data_table.device_status == "P":
                 st.info("Power ON 🔆")
-            elif data_table.device_status[0] == "S":
+            elif data_table.device_status == "S":
                 st.info("Standby 💤")
-            elif data_table.device_status[0] == "L":
+            elif data_table.device_status == "L":
                 st.info("Line 🔌")
-            elif data_table.device_status[0] == "B":
+            elif data_table.device_status == "B":
                 st.info("Battery 🔋")
             else:
                 st.info("None")
         col5.write("**Alarms Count:**")
-        col6.error(f"{utils.count_ones_in_hex(AL1.data[0]['triggers'])} Alarms(s)")
+        col6.error(f"{len(AlarmMask.from_hex(critical['triggers']))} Alarms(s)")
         col7.write("**Warnings Count:**")
-        col8.warning(f"{utils.count_ones_in_hex(AL2.data[0]['triggers'])} Warning(s)")
-
-        st.write('## Grid')
-        col1, col2, col3 = st.columns(3)
-        col1.container(border=True).metric("Grid Voltage", f"{data_table.grid_voltage_input[0]:.2f} V",
-                                           f"{delta.grid_voltage_input[0]:.2f} V")
-        col2.container(border=True).metric("Grid Frequency", f"{data_table.grid_frequency_input[0]:.2f} Hz",
-                                           f"{delta.grid_frequency_input[0]:.2f} Hz")
-        col3.container(border=True).metric("Inverter Temperature", f"{data_table.inverter_temperature[0]:.2f} °C",
-                                           f"{delta.inverter_temperature[0]:.2f} °C")
-
-        st.write("---")
-        st.write('## AC Output')
-        col1, col2, col3, col4, col5 = st.columns(5)
-        col1.container(border=True).metric("AC Output Voltage", f"{data_table.ac_output_voltage[0]:.2f} V",
-                                           f"{delta.ac_output_voltage[0]:.2f} V")
-        col2.container(border=True).metric("AC Output Frequency", f"{data_table.ac_output_frequency[0]:.2f} Hz",
-                                           f"{delta.ac_output_frequency[0]:.2f} Hz")
-        col3.container(border=True).metric("AC Output Apparent Power", f"{data_table.ac_output_apparent_power[0]:.2f} VA",
-                                           f"{delta.ac_output_apparent_power[0]:.2f} VA")
-        col4.container(border=True).metric("AC Output Active Power", f"{data_table.ac_output_active_power[0]:.2f} W",
-                                           f"{delta.ac_output_active_power[0]:.2f} W")
-        col5.container(border=True).metric("AC Output Power Percentage",
-                                           f"{data_table.ac_output_power_percentage[0]:.2f} %",
-                                           f"{delta.ac_output_power_percentage[0]:.2f} %")
-
-        st.write("---")
-        st.write('## Battery')
-        col1, col2, col3, col4 = st.columns(4)
-        col1.container(border=True).metric("Battery Voltage", f"{data_table.battery_voltage[0]:.2f} V",
-                                           f"{delta.battery_voltage[0]:.2f} V")
-        col2.container(border=True).metric("Battery Charging Current", f"{data_table.battery_charging_current[0]:.2f} A",
-                                           f"{delta.battery_charging_current[0]:.2f} A")
-        col3.container(border=True).metric("Battery Charging Power", f"{data_table.battery_charging_power[0]:.2f} W",
-                                           f"{delta.battery_charging_power[0]:.2f} W")
-        col4.container(border=True).metric("Battery Discharging Current ",
-                                           f"{data_table.battery_discharging_current[0]:.2f} A",
-                                           f"{delta.battery_discharging_current[0]:.2f} A")
-
-        st.write("---")
-        st.write('## Photovoltaic')
-        col1, col2, col3 = st.columns(3)
-        col1.container(border=True).metric("PV Input Voltage", f"{data_table.pv_input_voltage[0]:.2f} V",
-                                           f"{delta.pv_input_voltage[0]:.2f} V")
-        col2.container(border=True).metric("PV Input Current", f"{data_table.pv_input_current[0]:.2f} A",
-                                           f"{delta.pv_input_current[0]:.2f} A")
-        col3.container(border=True).metric("PV Input Power", f"{data_table.pv_input_power[0]:.2f} W",
-                                           f"{delta.pv_input_power[0]:.2f} W")
+        col8.warning(f"{len(AlarmMask.from_hex(maintenance['triggers']))} Warning(s)")
 
+        if renderer == "html":
+            # All four sections as one element instead of ~60 (see modules/metric_grid.py).
+            st.html(metric_grid_html(data_table, delta))
+        else:
+            st.write('## Grid')
+            col1, col2, col3 = st.columns(3)
+            col1.container(border=True).metric("Grid Voltage", f"{data_table['grid_voltage_input']:.2f} V",
+                                               f"{delta['grid_voltage_input']:.2f} V")
+            col2.container(border=True).metric("Grid Frequency", f"{data_table['grid_frequency_input']:.2f} Hz",
+                                               f"{delta['grid_frequency_input']:.2f} Hz")
+            col3.container(border=True).metric("Inverter Temperature", f"{data_table['inverter_temperature']:.2f} °C",
+                                               f"{delta['inverter_temperature']:.2f} °C")
+
+            st.write("---")
+            st.write('## AC Output')
+            col1, col2, col3, col4, col5 = st.columns(5)
+            col1.container(border=True).metric("AC Output Voltage", f"{data_table['ac_output_voltage']:.2f} V",
+                                               f"{delta['ac_output_voltage']:.2f} V")
+            col2.container(border=True).metric("AC Output Frequency", f"{data_table['ac_output_frequency']:.2f} Hz",
+                                               f"{delta['ac_output_frequency']:.2f} Hz")
+            col3.container(border=True).metric("AC Output Apparent Power", f"{data_table['ac_output_apparent_power']:.2f} VA",
+                                               f"{delta['ac_output_apparent_power']:.2f} VA")
+            col4.container(border=True).metric("AC Output Active Power", f"{data_table['ac_output_active_power']:.2f} W",
+                                               f"{delta['ac_output_active_power']:.2f} W")
+            col5.container(border=True).metric("AC Output Power Percentage",
+                                               f"{data_table['ac_output_power_percentage']:.2f} %",
+                                               f"{delta['ac_output_power_percentage']:.2f} %")
+
+            st.write("---")
+            st.write('## Battery')
+            col1, col2, col3, col4 = st.columns(4)
+            col1.container(border=True).metric("Battery Voltage", f"{data_table['battery_voltage']:.2f} V",
+                                               f"{delta['battery_voltage']:.2f} V")
+            col2.container(border=True).metric("Battery Charging Current", f"{data_table['battery_charging_current']:.2f} A",
+                                               f"{delta['battery_charging_current']:.2f} A")
+            col3.container(border=True).metric("Battery Charging Power", f"{data_table['battery_charging_power']:.2f} W",
+                                               f"{delta['battery_charging_power']:.2f} W")
+            col4.container(border=True).metric("Battery Discharging Current ",
+                                               f"{data_table['battery_discharging_current']:.2f} A",
+                                               f"{delta['battery_discharging_current']:.2f} A")
+
+            st.write("---")
+            st.write('## Photovoltaic')
+            col1, col2, col3 = st.columns(3)
+            col1.container(border=True).metric("PV Input Voltage", f"{data_table['pv_input_voltage']:.2f} V",
+                                               f"{delta['pv_input_voltage']:.2f} V")
+            col2.container(border=True).metric("PV Input Current", f"{data_table['pv_input_current']:.2f} A",
+                                               f"{delta['pv_input_current']:.2f} A")
+            col3.container(border=True).metric("PV Input Power", f"{data_table['pv_input_power']:.2f} W",
+                                               f"{delta['pv_input_power']:.2f} W")
+
+        # Sparklines from the poller's in-memory history (needs two samples).
+        if history is not None and len(history[0]) > 1:
+            st.write("---")
+            st.write('## Trends')
+            timestamps, values = history
+            minutes = (timestamps[-1] - timestamps[0]) / 60
+            st.caption(f"Last {len(timestamps)} samples ({minutes:.0f} min)")
+            with np.errstate(invalid="ignore"):
+                rolling = np.nanmean(values[-ROLLING_SAMPLES:], axis=0)
+            labels = [TREND_LABELS.get(column, (column, "")) for column in (history_columns or TREND_LABELS)]
+            st.dataframe(
+                pd.DataFrame({
+                    "Metric": [label for label, _ in labels],
+                    "Latest": [f"{values[-1, i]:.2f} {unit}" for i, (_, unit) in enumerate(labels)],
+                    "Rolling avg": [f"{rolling[i]:.2f} {unit}" for i, (_, unit) in enumerate(labels)],
+                    "Trend": values.T.tolist(),
+                }),
+                column_config={
+                    "Rolling avg": st.column_config.TextColumn(help=f"Mean of the last {ROLLING_SAMPLES} samples"),
+                    "Trend": st.column_config.LineChartColumn(),
+                },
+                hide_index=True,
+                use_container_width=True,
+            )
+
+@profiled("commands")
 def commands(supabase, device_filter):
 
     st.header("Control & Commands")
 
     st.session_state["missing_data"] = False
     st.session_state["system_update"] = False
+    # Outcome of a command write confirmed in the previous run.
+    if "command_result" in st.session_state:
+        st.success(st.session_state.pop("command_result"), icon="✅")
+
+    # Last known commands_state row; command writes only send what differs from it.
+    response = timed_execute("commands_state.select",
+                             supabase.table("commands_state").select("*").eq("inverter_id", device_filter))
+    commands_row = response.data[0] if response.data else None
 
     # Retrieve battery data from the database for the given inverter_id.
-    response = supabase.table("battery_system").select("*").eq("inverter_id", device_filter).execute()
+    response = timed_execute("battery_system.select",
+                             supabase.table("battery_system").select("*").eq("inverter_id", device_filter))
     if response.data:
         record = response.data[0]
     else:
@@ -140,7 +215,8 @@ def commands(supabase, device_filter):
                         "battery_type": ["AGM (Absorbent Glass Mat)", "Flooded battery", "User-defined battery", "Lib (Lithium-Ion Battery)"].index(battery_type_str),
                         "enable_commands": enable_commands
                     }
-                    supabase.table("battery_system").upsert(data, on_conflict=["inverter_id"]).execute()
+                    timed_execute("battery_system.upsert",
+                                  supabase.table("battery_system").upsert(data, on_conflict=["inverter_id"]))
                     st.session_state["system_update"] = True
                     update_values = {
                         "inverter_id":device_filter,
@@ -164,8 +240,8 @@ def commands(supabase, device_filter):
                         "battery_dc_th": round(utils.battery_parameters[battery_voltage]["battery_dc_th"], 1),
                         "cf": True
                     }
-                    utils.upsert_to_database(supabase, device_filter, update_values)
-                    js_utils.refresh()
+                    # "Battery system updated" already tells the user something was saved.
+                    save_commands(supabase, device_filter, commands_row, update_values, report_unchanged=False)
                 else:
                     st.session_state["missing_data"] = True
         
@@ -176,14 +252,8 @@ def commands(supabase, device_filter):
 
     # Use a form so user changes can be submitted all at once.
     with st.form("settings_form"):
-        # Initialize session_state values if not already set
-        # Retrieve battery data from the database for the given inverter_id.
-
-
-        response = supabase.table("commands_state").select("*").eq("inverter_id", device_filter).execute()
-
-        if response.data:
-            record = response.data[0]
+        if commands_row:
+            record = commands_row
         else:
             # If no record is found, use default values.
             record = utils.battery_parameters[battery_voltage]
@@ -249,7 +319,7 @@ def commands(supabase, device_filter):
                     "battery_dc_th":  round(high_battery_current_input, 1),
                     "cf": True
                 }
-                utils.update_to_database(supabase, device_filter, update_values)
+                save_commands(supabase, device_filter, commands_row, update_values)
         with col2:
             reseted = st.form_submit_button("Reset to Default", use_container_width=True, disabled= not enable_commands)
             if reseted:
@@ -273,35 +343,18 @@ def commands(supabase, device_filter):
                     "battery_dc_th":  round(utils.battery_parameters[battery_voltage]["battery_dc_th"], 1),
                     "cf": True
                 }
-                utils.update_to_database(supabase, device_filter, update_values)
-                js_utils.refresh()
+                save_commands(supabase, device_filter, commands_row, update_values)
 
         
-def alarms(supabase, device_filter):
+@profiled("alarms")
+def alarms(supabase, user_id, device_filter):
     ch_f = False
-    # Define the critical alarms and maintenance warnings
-    critical_alarms = [
-        {"Flag": "Battery Low Voltage", "Message": "Attention! The battery voltage is critically low. Please take immediate action to prevent potential damage.", "Triggered": False},
-        {"Flag": "Low AC Output Voltage", "Message": "Alert! The AC output voltage is currently below the acceptable level. This may affect the performance of connected devices.", "Triggered": False},
-        {"Flag": "High AC Output Load Power Percentage", "Message": "Warning: High AC Output Load Power! Your system is experiencing a high load. The AC output power percentage has exceeded safe limits.", "Triggered": False},
-        {"Flag": "High Battery Discharging Current", "Message": "Warning: High Battery Discharging Current! The battery is discharging at a high level. Please check the load conditions.", "Triggered": False},
-        {"Flag": "High Inverter Temperature", "Message": "Warning: High Inverter Temperature! The inverter temperature is above safe levels. Check ventilation immediately.", "Triggered": False},
-        {"Flag": "Device Warning Status", "Message": "Warning: Inverter Fault Detected! Check the system and consult the manual for troubleshooting.", "Triggered": False},
-        {"Flag": "High AC Output Frequency", "Message": "Warning: High AC Output Frequency! The frequency is above normal levels. Please check the system.", "Triggered": False},
-        {"Flag": "Low AC Output Frequency", "Message": "Warning: Low AC Output Frequency! The frequency is below the normal range. Please check inverter settings.", "Triggered": False},
-    ]
-
-    maintenance_warnings = [
-        {"Flag": "Full Discharge Cycle", "Message": "Warning: Full Discharge Cycle Counted! A full discharge cycle has been completed. Monitor battery health and recharge as needed.", "Triggered": False},
-        {"Flag": "PV Cleaning Time", "Message": "Warning: PV Cleaning Required! It's time to clean the solar panels for optimal performance. Please schedule cleaning.", "Triggered": False},
-        {"Flag": "Battery Check", "Message": "Warning: Battery Check Required! Please inspect the battery's condition and connections for safety.", "Triggered": False},
-        {"Flag": "Total Statistics Display", "Message": "Warning: Total Statistics Display Alert! The total statistics are available. Please review.", "Triggered": False},
-    ]
-
-    data = supabase.table("critical_alarms").select("triggers", "updated_at").eq("inverter_id", device_filter).execute()
+    # Alarms, warnings and SOH of the inverter in one round trip.
+    snapshot = utils.get_inverter_snapshot(supabase, user_id, device_filter)
+    data = snapshot["critical_alarms"]
 
     # Convert the given timestamp to a datetime object
-    utc_time = datetime.fromisoformat(data.data[0]['updated_at'])
+    utc_time = datetime.fromisoformat(data['updated_at'])
     # Define GMT+3 timezone
     gmt_plus_three = timezone(timedelta(hours=3))
     # Convert UTC time to GMT+3
@@ -309,30 +362,17 @@ def alarms(supabase, device_filter):
     # Format the time to "YYYY-MM-DD HH:MM:SS"
     timeing = local_time.strftime("%Y-%m-%d %H:%M:%S")
 
-    # Input the current state in \xNN format
-    input_str = data.data[0]['triggers']
-
-    # Update alarm states based on input string
-    critical_alarms = utils.str_to_flags(input_str, critical_alarms)
-
-    # Create a DataFrame for all alarms
-    critical_alarms_df = pd.DataFrame(critical_alarms)
-
-    # Display only Triggered Critical Alarms
+    # Display only Triggered Critical Alarms (the \xNN triggers decoded against the catalog)
     st.markdown("## Critical Alarms")
     st.write(f"Latest update: {timeing} (GMT+3)")
-    triggered_critical_alarms = critical_alarms_df[critical_alarms_df["Triggered"]]  # Filter for triggered alarms
-    if not triggered_critical_alarms.empty:
-        st.dataframe(triggered_critical_alarms[["Flag", "Message"]], use_container_width=True, hide_index=True)
-    else:
-        st.dataframe(pd.DataFrame(columns=["Flag", "Message"]), use_container_width=True, hide_index=True)
+    st.dataframe(CRITICAL_ALARMS.triggered(data['triggers']), use_container_width=True, hide_index=True)
 
     # ===============================================
     st.write('---')
-    data = supabase.table("maintenance_warnings").select("triggers", "updated_at").eq("inverter_id", device_filter).execute()
+    data = snapshot["maintenance_warnings"]
 
     # Convert the given timestamp to a datetime object
-    utc_time = datetime.fromisoformat(data.data[0]['updated_at'])
+    utc_time = datetime.fromisoformat(data['updated_at'])
     # Define GMT+3 timezone
     gmt_plus_three = timezone(timedelta(hours=3))
     # Convert UTC time to GMT+3
@@ -343,35 +383,24 @@ def alarms(supabase, device_filter):
     st.markdown("## Maintenance Warnings")
     st.write(f"Latest update: {timeing} (GMT+3)")
 
-    # Input the current state in \xNN format
-    input_str = data.data[0]['triggers']
-
-    # Update alarm states based on input string
-    maintenance_warnings = utils.str_to_flags(input_str, maintenance_warnings)
-
-    # Create a DataFrame for all alarms
-    maintenance_warnings_df = pd.DataFrame(maintenance_warnings)
-
     # Display only Triggered Maintenance Warnings
-    triggered_maintenance_warnings = maintenance_warnings_df[maintenance_warnings_df["Triggered"]]  # Filter for triggered alarms
-    if not triggered_maintenance_warnings.empty:
-        st.dataframe(triggered_maintenance_warnings[["Flag", "Message"]], use_container_width=True, hide_index=True)
-    else:
-        st.dataframe(pd.DataFrame(columns=["Flag", "Message"]), use_container_width=True, hide_index=True)
+    st.dataframe(MAINTENANCE_WARNINGS.triggered(data['triggers']), use_container_width=True, hide_index=True)
 
     # Reset Maintenance Warnings Button
 
     if st.button("Verify"):
-        code = supabase.table("maintenance_warnings").update({"triggers" : "\\x00"}).eq("inverter_id", device_filter).execute()
+        code = timed_execute("maintenance_warnings.reset",
+                             supabase.table("maintenance_warnings").update({"triggers" : "\\x00"}).eq("inverter_id", device_filter))
         st.write(f"You clicked the button on iteration!")
-        code = supabase.table("SOH").update({"CFDC": False, "battery_cheak": False, "clean_PV_panels": False,  "statistics_ready": False}).eq("inverter_id", device_filter).execute()
+        code = timed_execute("SOH.reset",
+                             supabase.table("SOH").update({"CFDC": False, "battery_cheak": False, "clean_PV_panels": False,  "statistics_ready": False}).eq("inverter_id", device_filter))
         st.rerun()
     
     # fuzzy:
     st.write("---")
 
-    Rn = supabase.table("SOH").select("Rn").eq("inverter_id",device_filter).execute()
-    Rn = Rn.data[0]['Rn']
+    soh = snapshot["soh"]
+    Rn = soh['Rn']
     if Rn is not None and Rn != 0:
         with st.expander("press to View Battery Health"):
             st.subheader("State of health (SOH)")
@@ -383,26 +412,96 @@ def alarms(supabase, device_filter):
 
 
     # Display the Plotly chart
-    data = supabase.table("SOH").select("statistics_ready", "statistics_ready_date", "Cday_copy", "Pday_copy").eq("inverter_id", device_filter).execute()
     # Convert the given timestamp to a datetime object
-    data_cheak = len(data.data[0]['Pday_copy'])
+    data_cheak = len(soh['Pday_copy'])
     if data_cheak > 0:
         with st.expander("press to View Statistics"):
             st.subheader("Total Statistics Display")
-            utc_time = datetime.fromisoformat(data.data[0]['statistics_ready_date'])
+            utc_time = datetime.fromisoformat(soh['statistics_ready_date'])
             # Define GMT+3 timezone
             gmt_plus_three = timezone(timedelta(hours=3))
             # Convert UTC time to GMT+3
             local_time = utc_time.astimezone(gmt_plus_three)
             # Format the time to "YYYY-MM-DD HH:MM:SS"
             timeing = local_time.strftime("%Y-%m-%d %H:%M:%S")
-            date = utils.get_last_30_days(datetime.strptime(timeing, "%Y-%m-%d %H:%M:%S"))
-            fig = utils.create_plotly_chart_power(date, data.data[0]['Pday_copy'], timeing)
-            fig2 = utils.create_plotly_chart_dcc(date, data.data[0]['Cday_copy'], timeing)
+            # The statistics only change once a day: build each figure once per
+            # (inverter, statistics date) and replay the cached dict afterwards.
+            figures = get_figure_cache()
+            cache_key = (device_filter, soh['statistics_ready_date'])
+            fig = figures.get_or_build(("power", *cache_key), lambda: utils.create_plotly_chart_power(
+                utils.get_last_30_days(local_time), soh['Pday_copy'], timeing))
+            fig2 = figures.get_or_build(("dcc", *cache_key), lambda: utils.create_plotly_chart_dcc(
+                utils.get_last_30_days(local_time), soh['Cday_copy'], timeing))
             st.plotly_chart(fig, use_container_width=True, key="plot1")
             st.plotly_chart(fig2, use_container_width=True, key="plot2")
 
 
+def fleet(supabase, inverter_ids, columns):
+    st.header("Fleet Overview")
+    if not inverter_ids:
+        st.info("No inverters linked to this account")
+        return
+
+    # One batched query for every inverter, then one vectorized pass for the statistics.
+    try:
+        telemetry = fleet_utils.get_fleet_telemetry(supabase, tuple(inverter_ids), tuple(columns))
+        alarm_counts = fleet_utils.get_fleet_alarm_counts(supabase, tuple(inverter_ids))
+    except APIError:
+        st.error("The fleet data could not be loaded, please try again later.", icon="🚨")
+        return
+    summary, units = fleet_utils.summarize_fleet(telemetry, columns)
+    units = units.merge(alarm_counts, on="inverter_id", how="left")
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.container(border=True).metric("Inverters", len(units))
+    col2.container(border=True).metric("Online", int(units["online"].eq(True).sum()))
+    col3.container(border=True).metric("Units with Outliers", int((units["Outliers"] > 0).sum()))
+    col4.container(border=True).metric("Active Alarms", int(alarm_counts["Alarms"].sum()),
+                                       f"{int(alarm_counts['Warnings'].sum())} warning(s)", delta_color="off")
+
+    st.write("## Fleet Totals")
+    st.dataframe(summary.style.format(precision=2, na_rep="—"), use_container_width=True)
+
+    st.write("---")
+    st.write("## Inverters")
+    st.caption("Click a column header to sort. Outliers are values far from the fleet median.")
+    st.dataframe(units.sort_values("Outliers", ascending=False),
+                 use_container_width=True, hide_index=True)
+
+
+def alarm_history(device_filter):
+    st.header("Alarm History")
+    st.caption("Alarms and warnings raised or cleared while the inverter was being monitored.")
+    # The poller records nothing with `[alarm_log] enabled = false`; don't create an empty store.
+    if not st.secrets.get("alarm_log", {}).get("enabled", True):
+        st.info("Alarm history is disabled")
+        return
+    gmt_plus_three = timezone(timedelta(hours=3))
+    today = datetime.now(gmt_plus_three).date()
+    col1, col2 = st.columns(2)
+    start_day = col1.date_input("From", value=today - timedelta(days=7), max_value=today)
+    end_day = col2.date_input("To", value=today, min_value=start_day, max_value=today)
+
+    # Indexed range query on the local event log; the end day is inclusive.
+    start = datetime.combine(start_day, datetime.min.time(), gmt_plus_three).timestamp()
+    end = datetime.combine(end_day + timedelta(days=1), datetime.min.time(), gmt_plus_three).timestamp()
+    events = get_alarm_log().query(device_filter, start, end)
+    if not events:
+        st.info("No alarm changes recorded in this period")
+        return
+
+    catalogs = {"critical": CRITICAL_ALARMS, "maintenance": MAINTENANCE_WARNINGS}
+    history = pd.DataFrame(events, columns=["kind", "flag", "raised", "ts"])
+    history["Time (GMT+3)"] = pd.to_datetime(history["ts"], unit="s", utc=True).dt.tz_convert(gmt_plus_three) \
+        .dt.strftime("%Y-%m-%d %H:%M:%S")
+    history["Type"] = history["kind"].map({"critical": "Critical Alarm", "maintenance": "Maintenance Warning"})
+    history["Flag"] = [catalogs[kind].flags[flag] if flag < len(catalogs[kind]) else f"Bit {flag}"
+                       for kind, flag in zip(history["kind"], history["flag"])]
+    history["Event"] = history["raised"].map({1: "Raised", 0: "Cleared"})
+    st.dataframe(history[["Time (GMT+3)", "Type", "Flag", "Event"]], use_container_width=True, hide_index=True)
+
+
+@profiled("account")
 def account(supabase, user_id, inverter_ids):
     if 'flags' not in st.session_state:
         st.session_state['flags'] = {
@@ -436,7 +535,8 @@ def account(supabase, user_id, inverter_ids):
         st.write("### Account Information")
         st.write("---")
 
-        data = supabase.table("user_authentication").select("username", "email").eq("id", user_id).execute()
+        data = timed_execute("user_authentication.select_profile",
+                             supabase.table("user_authentication").select("username", "email").eq("id", user_id))
         username = st.text_input("Username", value=data.data[0]["username"]).strip()
         email = st.text_input("Email", value=data.data[0]["email"]).strip()
 
@@ -450,10 +550,12 @@ def account(supabase, user_id, inverter_ids):
                 st.session_state['flags']['invalid_email'] = True
 
             try:
-                response = supabase.table("user_authentication").update({
+                response = timed_execute("user_authentication.update_profile", supabase.table("user_authentication").update({
                     "username": username,
                     "email": email,
-                }).eq("id", user_id).execute()
+                }).eq("id", user_id))
+                # The cached identity still holds the old username and email.
+                get_token_cache().invalidate_user(user_id)
                 
                 st.session_state["flags"]["save_success"] = True
 
@@ -470,24 +572,31 @@ def account(supabase, user_id, inverter_ids):
                     fields_filled = all([email, old_password, new_password, confirm_password])
                     st.session_state['flags']['missing_data'] = not fields_filled
                     
-                    db_pass = supabase.table("user_authentication").select("password").eq("id", user_id).execute()
-                    if not utils.verify_value(old_password, db_pass.data[0]['password']):
-                        st.session_state['flags']['wrong_password'] = True
+                    db_pass = timed_execute("user_authentication.select_password",
+                                            supabase.table("user_authentication").select("password").eq("id", user_id))
+                    try:
+                        if not utils.verify_value(old_password, db_pass.data[0]['password']):
+                            st.session_state['flags']['wrong_password'] = True
 
-                    if old_password and len(old_password) < 8:
-                        st.session_state['flags']['password_too_short'] = True
+                        if old_password and len(old_password) < 8:
+                            st.session_state['flags']['password_too_short'] = True
 
-                    if new_password and len(new_password) < 8:
-                        st.session_state['flags']['password_too_short'] = True
-                    
-                    if new_password and confirm_password and (new_password != confirm_password):
-                        st.session_state['flags']['passwords_do_not_match'] = True
+                        if new_password and len(new_password) < 8:
+                            st.session_state['flags']['password_too_short'] = True
+
+                        if new_password and confirm_password and (new_password != confirm_password):
+                            st.session_state['flags']['passwords_do_not_match'] = True
 
-                    flags_to_check = ["invalid_email", "passwords_do_not_match", "password_too_short", "missing_data", "wrong_password"]
-                    if all(not st.session_state['flags'][flag] for flag in flags_to_check):
-                        # user_response = supabase.table("user_authentication").select("id").eq("email", email).execute()
-                        supabase.table("user_authentication").update({"password":utils.hash_value(new_password)}).eq("email", email).execute()
-                        st.session_state["flags"]["reset_success"] = True
+                        flags_to_check = ["invalid_email", "passwords_do_not_match", "password_too_short", "missing_data", "wrong_password"]
+                        if all(not st.session_state['flags'][flag] for flag in flags_to_check):
+                            # user_response = supabase.table("user_authentication").select("id").eq("email", email).execute()
+                            timed_execute("user_authentication.update_password",
+                                          supabase.table("user_authentication").update({"password":utils.hash_value(new_password)}).eq("email", email))
+                            # Sessions resolved from a cached token must look the user up again.
+                            get_token_cache().invalidate_user(user_id)
+                            st.session_state["flags"]["reset_success"] = True
+                    except HashingBusy as e:
+                        st.error(str(e))
 
 
         error_msg = utils.generate_error_message(st.session_state['flags'])
@@ -521,19 +630,24 @@ def account(supabase, user_id, inverter_ids):
                 if st.form_submit_button("Add Inverter", use_container_width=True):
                     if inverter_id and pin_code:
                         # Query the Supabase table
-                        result = supabase.table("company_inverters").select("inverter_id", "pin_code", "user_id").eq("inverter_id", inverter_id).execute()
+                        result = timed_execute("company_inverters.select_by_id",
+                                               supabase.table("company_inverters").select("inverter_id", "pin_code", "user_id").eq("inverter_id", inverter_id))
                         if result and result.data:
-                            # The inverter exists and matches the pin code
-                            if utils.verify_value(pin_code, result.data[0]['pin_code']):
-                                if result.data[0]['user_id'] == None:
-                                    # Update the inverter to link it to the user_id
-                                    update_result = supabase.table("company_inverters").update({"user_id": user_id}).eq("inverter_id", inverter_id).execute()
-                                    if update_result:
-                                        st.session_state["flags"]["link_success"] = True
+                            try:
+                                # The inverter exists and matches the pin code
+                                if utils.verify_value(pin_code, result.data[0]['pin_code']):
+                                    if result.data[0]['user_id'] == None:
+                                        # Update the inverter to link it to the user_id
+                                        update_result = timed_execute("company_inverters.link",
+                                                                      supabase.table("company_inverters").update({"user_id": user_id}).eq("inverter_id", inverter_id))
+                                        if update_result:
+                                            st.session_state["flags"]["link_success"] = True
+                                    else:
+                                        st.session_state['flags']["used_inverter"] = True
                                 else:
-                                    st.session_state['flags']["used_inverter"] = True
-                            else:
-                                st.session_state['flags']["inverter_wrong_info"] = True
+                                    st.session_state['flags']["inverter_wrong_info"] = True
+                            except HashingBusy as e:
+                                st.error(str(e))
                         else:
                             st.session_state['flags']["inverter_wrong_info"] = True
                     else:
@@ -553,7 +667,8 @@ def account(supabase, user_id, inverter_ids):
                         if selected_inverter_ids:
                             # Perform delete operation in Supabase
                             for inverter_id in selected_inverter_ids:
-                                delete_result = supabase.table("company_inverters").update({"user_id": None}).eq("inverter_id", inverter_id).execute()
+                                delete_result = timed_execute("company_inverters.unlink",
+                                                              supabase.table("company_inverters").update({"user_id": None}).eq("inverter_id", inverter_id))
                                 st.rerun()
                     
                     
@@ -585,26 +700,44 @@ Your data will be deleted, except we may retain some metadata and logs for longe
 # ============================================================================
 #   Helper Functions
 # ============================================================================
+def save_commands(supabase, device_filter, current, update_values, report_unchanged=True):
+    """
+    Send the commands_state columns of `update_values` that differ from `current` and
+    rerun once the database has confirmed the write. With `report_unchanged`, say so
+    when there was nothing to send.
+    """
+    writer = get_command_writer(supabase)
+    try:
+        row = writer.submit(device_filter, current, update_values, current_session_id()).wait(writer.write_timeout)
+    except CommandWriteError as e:
+        st.error(str(e), icon="🚨")
+        return
+    if row is None:
+        if report_unchanged:
+            st.info("No settings changed", icon="ℹ️")
+        return
+    st.session_state["command_result"] = "Settings sent to the inverter"
+    st.rerun()
+
 @st.dialog("Are you sure you want to delete your account?")
 def confirm(supabase, user_id):
     col1, col2 = st.columns(2, vertical_alignment='center')
     with col1:
         if st.button("Proceed", use_container_width=True):
             # 1. Update company_inverters table: Set user_id to null for all rows associated with the user
-            update_response = supabase.table("company_inverters")\
+            update_response = timed_execute("company_inverters.unlink_user", supabase.table("company_inverters")\
                                     .update({"user_id": None})\
-                                    .eq("user_id", user_id)\
-                                    .execute()
+                                    .eq("user_id", user_id))
             # 2. Delete user from user_authentication table
-            delete_response = supabase.table("user_authentication")\
+            delete_response = timed_execute("user_authentication.delete", supabase.table("user_authentication")\
                                     .delete()\
-                                    .eq("id", user_id)\
-                                    .execute()
+                                    .eq("id", user_id))
             # 3. Optionally perform further cleanup like logging user out, redirecting, etc.
-            js_utils.save_to_storage("sessionStorage", "is_signed", False)
-            js_utils.save_to_storage("sessionStorage", "user_email", "")
-            js_utils.save_to_storage("localStorage", "access_token", "")
-            js_utils.refresh()  # Force a browser-level refresh via JS helper.
+            get_token_cache().invalidate_user(user_id)
+            # Clear sign-in flags and tokens and refresh the browser in one JS round trip.
+            js_utils.save_many([("sessionStorage", "is_signed", False),
+                                ("sessionStorage", "user_email", ""),
+                                ("localStorage", "access_token", "")], reload=True)
             st.rerun()
 
     with col2:
@@ -0,0 +1,213 @@
+import heapq
+import queue
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+import streamlit as st
+
+# Defaults, overridable from an [outbox] section in the secrets.
+BATCH_SIZE = 10          # emails sent per transport session check / SMTP connection
+MAX_ATTEMPTS = 5         # tries per email before it is dropped
+BASE_BACKOFF = 2         # seconds before the first retry, doubled on every failure
+MAX_BACKOFF = 120
+SESSION_TTL = 30 * 60    # seconds a ProtonMail login is reused before logging in again
+
+
+class Email:
+    __slots__ = ("recipient", "subject", "html", "attempts")
+
+    def __init__(self, recipient, subject, html):
+        self.recipient = recipient
+        self.subject = subject
+        self.html = html
+        self.attempts = 0
+
+
+class ProtonMailTransport:
+    """
+    Sends through one long-lived, authenticated ProtonMail session.
+
+    The login (SRP and PGP key setup) happens on the first send and again only after
+    `session_ttl` seconds or after a failed send, which usually means an expired session.
+    """
+
+    def __init__(self, username, password, session_ttl=SESSION_TTL):
+        self.username = username
+        self.password = password
+        self.session_ttl = session_ttl
+        self._proton = None
+        self._logged_in_at = 0.0
+
+    def _session(self):
+        if self._proton is None or time.monotonic() - self._logged_in_at > self.session_ttl:
+            from protonmail import ProtonMail
+
+            proton = ProtonMail(logging_level=0)
+            proton.login(self.username, self.password)
+            self._proton = proton
+            self._logged_in_at = time.monotonic()
+        return self._proton
+
+    def send(self, emails):
+        """Send `emails`; returns the ones that failed."""
+        proton = self._session()
+        failed = []
+        for email in emails:
+            try:
+                message = proton.create_message(recipients=[email.recipient], subject=email.subject, body=email.html)
+                proton.send_message(message)
+            except Exception:
+                failed.append(email)
+        if failed:
+            # Log in again on the next batch in case the session went stale.
+            self._proton = None
+        return failed
+
+
+class SMTPTransport:
+    """
+    Sends over plain SMTP, one connection per batch. Pointed at
+    devtools/mail_standin.py it lets the recovery flow run without a mail account.
+    """
+
+    def __init__(self, host="localhost", port=1025, sender="support@solsync.local",
+                 username=None, password=None, starttls=False, timeout=10):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def send(self, emails):
+        """Send `emails`; returns the ones that failed."""
+        try:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        except OSError:
+            return list(emails)
+        failed = []
+        with smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            for email in emails:
+                message = EmailMessage()
+                message["From"] = self.sender
+                message["To"] = email.recipient
+                message["Subject"] = email.subject
+                message.set_content(email.html, subtype="html")
+                try:
+                    smtp.send_message(message)
+                except smtplib.SMTPException:
+                    failed.append(email)
+        return failed
+
+
+class Outbox:
+    """
+    Queue of outgoing emails drained by one background worker.
+
+    `enqueue()` returns immediately. The worker sends up to `batch_size` queued emails
+    per transport call and retries failures with exponential backoff, giving up after
+    `max_attempts`.
+    """
+
+    def __init__(self, transport, batch_size=BATCH_SIZE, max_attempts=MAX_ATTEMPTS,
+                 base_backoff=BASE_BACKOFF, max_backoff=MAX_BACKOFF):
+        self.transport = transport
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.sent = 0
+        self.dropped = 0
+        self._queue = queue.Queue()
+        # (due time, sequence, email) of failed sends waiting for their retry.
+        self._retries = []
+        self._seq = 0
+        self._idle = threading.Condition()
+        self._in_flight = 0
+        self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, recipient, subject, html):
+        with self._idle:
+            self._in_flight += 1
+        self._queue.put(Email(recipient, subject, html))
+
+    @property
+    def pending(self):
+        """Emails queued, being sent or waiting for a retry."""
+        return self._in_flight
+
+    def flush(self, timeout=None):
+        """Block until every enqueued email is sent or dropped. Returns False on timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._in_flight == 0, timeout)
+
+    def _done(self, count):
+        with self._idle:
+            self._in_flight -= count
+            self._idle.notify_all()
+
+    def _next_batch(self):
+        """Wait for work, then collect up to `batch_size` emails that are due."""
+        timeout = max(0.0, self._retries[0][0] - time.monotonic()) if self._retries else None
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=timeout))
+        except queue.Empty:
+            pass
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        now = time.monotonic()
+        while self._retries and self._retries[0][0] <= now and len(batch) < self.batch_size:
+            batch.append(heapq.heappop(self._retries)[2])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                failed = self.transport.send(batch)
+            except Exception:
+                failed = list(batch)
+            finished = len(batch) - len(failed)
+            self.sent += finished
+            for email in failed:
+                email.attempts += 1
+                if email.attempts >= self.max_attempts:
+                    self.dropped += 1
+                    finished += 1
+                    continue
+                delay = min(self.max_backoff, self.base_backoff * 2 ** (email.attempts - 1))
+                self._seq += 1
+                heapq.heappush(self._retries, (time.monotonic() + delay, self._seq, email))
+            self._done(finished)
+
+
+@st.cache_resource(show_spinner=False)
+def get_outbox():
+    """
+    Return the process-wide outbox. `[outbox] transport = "smtp"` (with host/port/sender)
+    sends through SMTP instead of the ProtonMail account in `email`/`password`.
+    """
+    settings = dict(st.secrets.get("outbox", {}))
+    if settings.pop("transport", "protonmail") == "smtp":
+        transport = SMTPTransport(**{key: settings.pop(key) for key in
+                                     ("host", "port", "sender", "username", "password", "starttls")
+                                     if key in settings})
+    else:
+        transport = ProtonMailTransport(st.secrets.email, st.secrets.password,
+                                        settings.pop("session_ttl", SESSION_TTL))
+    return Outbox(transport, **{key: settings[key] for key in
+                                ("batch_size", "max_attempts", "base_backoff", "max_backoff")
+                                if key in settings})
@@ -0,0 +1,72 @@
+import logging
+import threading
+from contextlib import contextmanager
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+logger = logging.getLogger(__name__)
+
+
+class PayloadStats:
+    """Running totals of the messages and bytes a labelled block sent, per process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # label -> {"runs", "messages", "bytes", "last_bytes"}
+        self._totals = {}
+
+    def add(self, label, messages, size):
+        with self._lock:
+            totals = self._totals.setdefault(label, {"runs": 0, "messages": 0, "bytes": 0, "last_bytes": 0})
+            totals["runs"] += 1
+            totals["messages"] += messages
+            totals["bytes"] += size
+            totals["last_bytes"] = size
+
+    def report(self):
+        """{label: {"runs", "avg_messages", "avg_bytes", "last_bytes"}}."""
+        with self._lock:
+            return {label: {"runs": t["runs"],
+                            "avg_messages": t["messages"] / t["runs"],
+                            "avg_bytes": t["bytes"] / t["runs"],
+                            "last_bytes": t["last_bytes"]}
+                    for label, t in self._totals.items()}
+
+
+PAYLOAD_STATS = PayloadStats()
+
+
+class PayloadMeter:
+    __slots__ = ("messages", "bytes")
+
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+
+
+@contextmanager
+def measure_payload(label):
+    """
+    Count the ForwardMsgs (and their serialized size) this session sends to the browser
+    while the block runs, e.g. one Overview rerun. The size is that of the protobuf
+    messages before websocket framing and compression. Totals go to PAYLOAD_STATS and
+    the debug log; the yielded PayloadMeter has the numbers of this run.
+    """
+    meter = PayloadMeter()
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        yield meter
+        return
+    enqueue = ctx._enqueue
+
+    def counting_enqueue(msg):
+        meter.messages += 1
+        meter.bytes += msg.ByteSize()
+        enqueue(msg)
+
+    ctx._enqueue = counting_enqueue
+    try:
+        yield meter
+    finally:
+        ctx._enqueue = enqueue
+        PAYLOAD_STATS.add(label, meter.messages, meter.bytes)
+        logger.debug("%s sent %d messages, %d bytes", label, meter.messages, meter.bytes)
@@ -0,0 +1,260 @@
+import threading
+import time
+import logging
+from datetime import datetime
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from modules.utils import fetch_inverter_snapshot
+from modules.realtime_feed import RealtimeFeed
+from modules.ring_buffer import TelemetryRing
+from modules.telemetry import TelemetryVector, column_index
+from modules.alarm_log import get_alarm_log
+from modules.query_metrics import QUERY_PAGE
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two fetches of the same inverter.
+POLL_INTERVAL = 10
+# A session that has not renewed its subscription within this window is dropped.
+SUBSCRIPTION_TTL = 3 * POLL_INTERVAL
+# While a Realtime channel is live, inverters are only re-fetched this often as a safety net.
+LIVE_RESYNC_INTERVAL = 120
+
+
+class Snapshot:
+    """
+    Latest state of one inverter, shared by every session watching it. `parameters`
+    and `delta` are TelemetryVectors over the poller's columns.
+    """
+    __slots__ = ("version", "parameters", "delta", "critical", "maintenance", "soh", "fetched_at")
+
+    def __init__(self, version, parameters, delta, critical, maintenance, soh, fetched_at):
+        self.version = version
+        self.parameters = parameters
+        self.delta = delta
+        self.critical = critical
+        self.maintenance = maintenance
+        self.soh = soh
+        self.fetched_at = fetched_at
+
+
+class TelemetryPoller:
+    """
+    One background thread per server process that polls every *watched* inverter
+    once per interval and fans the result out to all subscribed sessions.
+
+    Sessions call `subscribe()` on every loop iteration (which also renews their lease)
+    and `unsubscribe()` when they leave the Overview page. Inverters nobody watches
+    are not polled.
+
+    With a Realtime `feed`, watched inverters are fetched when a row change is pushed
+    (`notify()`) and polling slows down to `live_interval`; when the channel drops the
+    poller falls back to `interval`. A snapshot only gets a new version when its data
+    actually changed.
+
+    With an `alarm_log`, every new snapshot's alarm and warning triggers are diffed
+    into raise/clear events.
+    """
+
+    def __init__(self, supabase, columns, interval=POLL_INTERVAL, ttl=SUBSCRIPTION_TTL,
+                 feed=None, live_interval=LIVE_RESYNC_INTERVAL, alarm_log=None):
+        self.supabase = supabase
+        self.columns = columns
+        self._index = column_index(columns)
+        self.interval = interval
+        self.ttl = ttl
+        self.feed = feed
+        self.live_interval = live_interval
+        self.alarm_log = alarm_log
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        # inverter_id -> {session_id: (user_id, last_seen)}
+        self._subscribers = {}
+        # session_id -> inverter_id
+        self._sessions = {}
+        # inverter_id -> Snapshot
+        self._snapshots = {}
+        # inverter_id -> TelemetryRing of the recent samples, dropped with the snapshot
+        self._history = {}
+        # inverter_id -> monotonic time of the next fetch
+        self._due = {}
+        self._thread = None
+
+    # ----------------------------
+    # Session side
+    # ----------------------------
+    def subscribe(self, session_id, user_id, inverter_id):
+        """Register (or renew) a session's interest in an inverter."""
+        with self._cond:
+            previous = self._sessions.get(session_id)
+            if previous is not None and previous != inverter_id:
+                self._drop(session_id, previous)
+            watchers = self._subscribers.setdefault(inverter_id, {})
+            is_new = inverter_id not in self._due
+            watchers[session_id] = (user_id, time.monotonic())
+            self._sessions[session_id] = inverter_id
+            if is_new:
+                # Fetch a newly watched inverter right away.
+                self._due[inverter_id] = 0
+                self._wake.set()
+                if self.feed is not None:
+                    self.feed.watch(inverter_id)
+        self._ensure_thread()
+
+    def unsubscribe(self, session_id):
+        with self._cond:
+            inverter_id = self._sessions.get(session_id)
+            if inverter_id is not None:
+                self._drop(session_id, inverter_id)
+
+    def notify(self, inverter_id):
+        """Fetch `inverter_id` as soon as possible (called by the Realtime feed)."""
+        with self._cond:
+            if inverter_id in self._due:
+                self._due[inverter_id] = 0
+                self._wake.set()
+
+    def latest(self, inverter_id):
+        with self._cond:
+            return self._snapshots.get(inverter_id)
+
+    def history(self, inverter_id):
+        """
+        (timestamps, values) copies of the recent telemetry of `inverter_id`, oldest
+        first, with one column per entry in `columns`; None if nothing was fetched yet.
+        """
+        with self._cond:
+            ring = self._history.get(inverter_id)
+            return ring.window() if ring is not None else None
+
+    def wait_for_update(self, inverter_id, version, timeout):
+        """
+        Block until the snapshot of `inverter_id` is newer than `version`
+        or `timeout` seconds have passed, then return the latest snapshot (may be None).
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                snapshot = self._snapshots.get(inverter_id)
+                remaining = deadline - time.monotonic()
+                if (snapshot is not None and snapshot.version != version) or remaining <= 0:
+                    return snapshot
+                self._cond.wait(remaining)
+
+    def watched(self):
+        with self._cond:
+            return list(self._subscribers)
+
+    # ----------------------------
+    # Poller side
+    # ----------------------------
+    def _drop(self, session_id, inverter_id):
+        # Caller holds the lock.
+        self._sessions.pop(session_id, None)
+        watchers = self._subscribers.get(inverter_id)
+        if watchers is not None:
+            watchers.pop(session_id, None)
+            if not watchers:
+                del self._subscribers[inverter_id]
+                self._due.pop(inverter_id, None)
+                if self.feed is not None:
+                    self.feed.unwatch(inverter_id)
+
+    def _expire(self, now):
+        # Drop sessions whose browser went away without unsubscribing.
+        with self._cond:
+            for inverter_id, watchers in list(self._subscribers.items()):
+                for session_id, (_, last_seen) in list(watchers.items()):
+                    if now - last_seen > self.ttl:
+                        self._drop(session_id, inverter_id)
+            # Forget snapshots of inverters nobody has watched for a while.
+            for inverter_id, snapshot in list(self._snapshots.items()):
+                if inverter_id not in self._subscribers and now - snapshot.fetched_at > self.ttl:
+                    del self._snapshots[inverter_id]
+                    self._history.pop(inverter_id, None)
+
+    def _fetch(self, inverter_id, user_id):
+        # Telemetry, alarms and SOH in one round trip.
+        state = fetch_inverter_snapshot(self.supabase, user_id, inverter_id)
+        if not state.get("telemetry"):
+            return
+        # Straight from the JSON into a float vector; no DataFrame on this path.
+        parameters = TelemetryVector.from_row(state["telemetry"][0], self._index)
+        critical, maintenance, soh = state.get("critical_alarms"), state.get("maintenance_warnings"), state.get("soh")
+        with self._cond:
+            previous = self._snapshots.get(inverter_id)
+            if previous is not None and previous.parameters.same_as(parameters) \
+                    and (previous.critical, previous.maintenance, previous.soh) == (critical, maintenance, soh):
+                # Nothing changed: keep the version so sessions don't re-render.
+                previous.fetched_at = time.monotonic()
+                return
+            if previous is not None:
+                delta = parameters - previous.parameters
+                version = previous.version + 1
+            else:
+                delta = parameters.zeros_like()
+                version = 1
+            self._snapshots[inverter_id] = Snapshot(version, parameters, delta, critical, maintenance, soh,
+                                                    time.monotonic())
+            ring = self._history.get(inverter_id)
+            if ring is None:
+                ring = self._history[inverter_id] = TelemetryRing(self.columns)
+            ring.append(datetime.fromisoformat(parameters.updated_at).timestamp(), parameters.values)
+            self._cond.notify_all()
+        if self.alarm_log is not None:
+            for kind, alarm in (("critical", critical), ("maintenance", maintenance)):
+                if alarm is not None:
+                    self.alarm_log.observe(inverter_id, kind, alarm["triggers"], alarm.get("updated_at"))
+
+    def _run(self):
+        # Snapshot queries are charged to the poller, not to whichever page subscribed.
+        QUERY_PAGE.set("poller")
+        while True:
+            self._wake.clear()
+            now = time.monotonic()
+            self._expire(now)
+            with self._cond:
+                due = [(inv, next(iter(w.values()))[0]) for inv, w in self._subscribers.items()
+                       if self._due.get(inv, 0) <= now]
+                for inverter_id, _ in due:
+                    live = self.feed is not None and self.feed.is_live(inverter_id)
+                    self._due[inverter_id] = now + (self.live_interval if live else self.interval)
+            for inverter_id, user_id in due:
+                try:
+                    self._fetch(inverter_id, user_id)
+                except Exception:
+                    logger.exception("Polling inverter %s failed", inverter_id)
+            with self._cond:
+                next_due = min(self._due.values(), default=now + self.interval)
+            self._wake.wait(max(0.0, next_due - time.monotonic()))
+
+    def _ensure_thread(self):
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="telemetry-poller", daemon=True)
+                self._thread.start()
+
+
+@st.cache_resource(show_spinner=False)
+def get_poller(_supabase, columns):
+    """
+    Return the process-wide poller (created once per server process).
+
+    Push updates are on unless `[realtime] enabled = false` is set in the secrets;
+    `[realtime] url` points the feed at another server, e.g. a local stand-in.
+    Alarm transitions are logged unless `[alarm_log] enabled = false`.
+    """
+    poller = TelemetryPoller(_supabase, list(columns))
+    settings = st.secrets.get("realtime", {})
+    url = settings.get("url", _supabase.realtime_url)
+    # No url: the backend has no realtime endpoint (e.g. the fake backend), poll only.
+    if settings.get("enabled", True) and url:
+        poller.feed = RealtimeFeed(url, _supabase.supabase_key, on_event=poller.notify)
+    if st.secrets.get("alarm_log", {}).get("enabled", True):
+        poller.alarm_log = get_alarm_log()
+    return poller
+
+
+def current_session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "default"
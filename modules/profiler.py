@@ -0,0 +1,131 @@
+import cProfile
+import functools
+import io
+import logging
+import marshal
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# Latest runs kept per stage (process-wide, all sessions).
+STAGE_WINDOW = 500
+# Session-state key of a pending cProfile capture.
+CAPTURE_KEY = "_profile_capture"
+
+
+class StageTimings:
+    """Rolling wall and CPU times per stage (main, dashboard, page functions), per process."""
+
+    def __init__(self, window=STAGE_WINDOW):
+        self._lock = threading.Lock()
+        self.window = window
+        # stage -> deque of (wall seconds, cpu seconds)
+        self._runs = {}
+
+    def add(self, stage, wall, cpu):
+        with self._lock:
+            runs = self._runs.get(stage)
+            if runs is None:
+                runs = self._runs[stage] = deque(maxlen=self.window)
+            runs.append((wall, cpu))
+
+    def report(self):
+        """
+        [{"stage", "runs", "wall_p50_ms", "wall_p95_ms", "cpu_p50_ms", "cpu_share"}], slowest first.
+        `cpu_share` is CPU over wall time: near 1 the stage computes (pandas, Plotly,
+        element emission), near 0 it waits (queries, locks, sleeps).
+        """
+        with self._lock:
+            runs = {stage: list(r) for stage, r in self._runs.items()}
+        rows = []
+        for stage, r in runs.items():
+            wall = sorted(w for w, _ in r)
+            cpu = sorted(c for _, c in r)
+            rows.append({"stage": stage, "runs": len(r),
+                         "wall_p50_ms": _pick(wall, 0.5) * 1000, "wall_p95_ms": _pick(wall, 0.95) * 1000,
+                         "cpu_p50_ms": _pick(cpu, 0.5) * 1000,
+                         "cpu_share": sum(cpu) / sum(wall) if sum(wall) else 0.0})
+        return sorted(rows, key=lambda row: row["wall_p50_ms"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._runs.clear()
+
+
+def _pick(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+STAGE_TIMINGS = StageTimings()
+
+
+def profiled(stage):
+    """
+    Decorator recording the wall time and the calling thread's CPU time of every call
+    in STAGE_TIMINGS under `stage`, also when the call ends in st.stop()/st.rerun().
+    Nested stages are inclusive (main contains dashboard contains the page).
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            wall, cpu = time.perf_counter(), time.thread_time()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                STAGE_TIMINGS.add(stage, time.perf_counter() - wall, time.thread_time() - cpu)
+        return wrapper
+    return decorate
+
+
+def request_capture(reruns):
+    """Profile the next `reruns` full reruns of the current session with cProfile."""
+    st.session_state[CAPTURE_KEY] = {"remaining": reruns, "reruns": 0, "stats": None}
+
+
+def capture_status():
+    """The current session's capture: {"remaining", "reruns", "stats"}, or None."""
+    return st.session_state.get(CAPTURE_KEY)
+
+
+@contextmanager
+def capture_rerun():
+    """
+    Run the block under cProfile if the session asked for a capture, adding the
+    result to the capture's pstats until its reruns are used up.
+    """
+    capture = st.session_state.get(CAPTURE_KEY)
+    if not capture or capture["remaining"] <= 0:
+        yield
+        return
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        stats = pstats.Stats(profile, stream=io.StringIO())
+        if capture["stats"] is not None:
+            stats.add(capture["stats"])
+        capture["stats"] = stats
+        capture["remaining"] -= 1
+        capture["reruns"] += 1
+        if capture["remaining"] == 0:
+            logger.info("cProfile capture of %d reruns finished", capture["reruns"])
+
+
+def capture_dump(capture):
+    """The capture as a .prof file (pstats marshal format), for snakeviz, flameprof or gprof2dot."""
+    return marshal.dumps(capture["stats"].stats)
+
+
+def capture_summary(capture, limit=15):
+    """Top `limit` functions of the capture by cumulative time, as text."""
+    stream = io.StringIO()
+    capture["stats"].stream = stream
+    capture["stats"].sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
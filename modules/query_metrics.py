@@ -0,0 +1,125 @@
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets, as in Prometheus client defaults.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Page the current thread's queries are charged to; dashboard() sets it per rerun.
+QUERY_PAGE = ContextVar("query_page", default="app")
+
+
+class QueryStats:
+    """Per (query name, page) latency, rows, payload bytes and errors, per process."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        # (name, page) -> {"calls", "errors", "seconds", "max_seconds", "rows", "bytes", "buckets"}
+        self._totals = {}
+
+    def add(self, name, page, seconds, rows=0, size=0, error=False):
+        with self._lock:
+            totals = self._totals.get((name, page))
+            if totals is None:
+                totals = self._totals[(name, page)] = {"calls": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0,
+                                                       "rows": 0, "bytes": 0, "buckets": [0] * len(self.buckets)}
+            totals["calls"] += 1
+            totals["errors"] += error
+            totals["seconds"] += seconds
+            totals["max_seconds"] = max(totals["max_seconds"], seconds)
+            totals["rows"] += rows
+            totals["bytes"] += size
+            n = bisect_left(self.buckets, seconds)
+            if n < len(self.buckets):
+                totals["buckets"][n] += 1
+
+    def report(self):
+        """[{"query", "page", "calls", "errors", "total_ms", "avg_ms", "max_ms", "rows", "kb"}], slowest first."""
+        with self._lock:
+            rows = [{"query": name, "page": page, "calls": t["calls"], "errors": t["errors"],
+                     "total_ms": t["seconds"] * 1000, "avg_ms": t["seconds"] * 1000 / t["calls"],
+                     "max_ms": t["max_seconds"] * 1000, "rows": t["rows"], "kb": t["bytes"] / 1024}
+                    for (name, page), t in self._totals.items()]
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def by_page(self):
+        """{page: backend seconds} over all queries."""
+        pages = {}
+        with self._lock:
+            for (_, page), t in self._totals.items():
+                pages[page] = pages.get(page, 0.0) + t["seconds"]
+        return pages
+
+    def reset(self):
+        with self._lock:
+            self._totals.clear()
+
+    def prometheus(self, prefix="solsync_query"):
+        """The totals in the Prometheus text exposition format."""
+        with self._lock:
+            totals = {key: dict(t, buckets=list(t["buckets"])) for key, t in self._totals.items()}
+        lines = [
+            f"# HELP {prefix}_duration_seconds Backend query latency.",
+            f"# TYPE {prefix}_duration_seconds histogram",
+        ]
+        for (name, page), t in sorted(totals.items()):
+            labels = f'query="{_label(name)}",page="{_label(page)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, t["buckets"]):
+                cumulative += count
+                lines.append(f'{prefix}_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_duration_seconds_bucket{{{labels},le="+Inf"}} {t["calls"]}')
+            lines.append(f"{prefix}_duration_seconds_sum{{{labels}}} {t['seconds']:.6f}")
+            lines.append(f"{prefix}_duration_seconds_count{{{labels}}} {t['calls']}")
+        for metric, key, help_text in (("errors_total", "errors", "Backend queries that raised."),
+                                       ("rows_total", "rows", "Rows returned by backend queries."),
+                                       ("response_bytes_total", "bytes", "JSON size of backend query results.")):
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} counter")
+            for (name, page), t in sorted(totals.items()):
+                lines.append(f'{prefix}_{metric}{{query="{_label(name)}",page="{_label(page)}"}} {t[key]}')
+        return "\n".join(lines) + "\n"
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+QUERY_STATS = QueryStats()
+
+
+def timed_execute(name, query):
+    """
+    `query.execute()`, recorded in QUERY_STATS under `name` and the current page:
+    wall time, rows returned, the size of the result as JSON (the response body
+    before compression) and whether it raised.
+    """
+    page = QUERY_PAGE.get()
+    start = time.perf_counter()
+    try:
+        response = query.execute()
+    except Exception:
+        QUERY_STATS.add(name, page, time.perf_counter() - start, error=True)
+        raise
+    seconds = time.perf_counter() - start
+    data = response.data
+    rows = len(data) if isinstance(data, list) else int(bool(data))
+    QUERY_STATS.add(name, page, seconds, rows, len(json.dumps(data, default=str)))
+    logger.debug("%s (%s) took %.1f ms, %d rows", name, page, seconds * 1000, rows)
+    return response
+
+
+@contextmanager
+def query_page(page):
+    """Charge the queries run inside the block to `page`."""
+    token = QUERY_PAGE.set(page)
+    try:
+        yield
+    finally:
+        QUERY_PAGE.reset(token)
@@ -0,0 +1,146 @@
+import asyncio
+import threading
+import logging
+from realtime import AsyncRealtimeClient
+from websockets.protocol import State
+from modules.utils import TELEMETRY_TABLE
+
+logger = logging.getLogger(__name__)
+
+# Tables whose row changes should refresh the Overview of an inverter.
+WATCHED_TABLES = (TELEMETRY_TABLE, "critical_alarms", "maintenance_warnings")
+# Seconds between two health checks of the websocket and channel states.
+CHECK_INTERVAL = 2
+# Upper bound for the reconnect backoff in seconds.
+MAX_BACKOFF = 60
+
+
+class RealtimeFeed:
+    """
+    Supabase Realtime subscription for the inverters currently watched by the poller.
+
+    One websocket per server process, one channel per inverter with a
+    `postgres_changes` binding for each table in `WATCHED_TABLES`. Every row change
+    calls `on_event(inverter_id)`; so does a channel dropping, so the caller can fall
+    back to polling right away. `is_live()` tells whether push updates can be trusted.
+    """
+
+    def __init__(self, url, key, on_event, tables=WATCHED_TABLES, schema="public",
+                 check_interval=CHECK_INTERVAL):
+        self.url = url
+        self.key = key
+        self.on_event = on_event
+        self.tables = tuple(tables)
+        self.schema = schema
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._wanted = set()
+        self._live = set()
+        self._loop = None
+        self._changed = None
+        self._thread = None
+
+    def watch(self, inverter_id):
+        with self._lock:
+            self._wanted.add(inverter_id)
+        self._ensure_thread()
+        self._kick()
+
+    def unwatch(self, inverter_id):
+        with self._lock:
+            self._wanted.discard(inverter_id)
+        self._kick()
+
+    def is_live(self, inverter_id):
+        with self._lock:
+            return inverter_id in self._live
+
+    # ----------------------------
+    # Event loop side
+    # ----------------------------
+    def _kick(self):
+        loop, changed = self._loop, self._changed
+        if loop is not None and changed is not None:
+            loop.call_soon_threadsafe(changed.set)
+
+    def _set_live(self, live):
+        with self._lock:
+            dropped = self._live - live
+            self._live = live
+        # A dropped channel means the poller must take over immediately.
+        for inverter_id in dropped:
+            self.on_event(inverter_id)
+
+    def _on_change(self, inverter_id, table):
+        logger.debug("Realtime change on %s for %s", table, inverter_id)
+        self.on_event(inverter_id)
+
+    @staticmethod
+    def _is_open(client):
+        return client is not None and client.ws_connection is not None \
+            and client.ws_connection.state is State.OPEN
+
+    async def _join(self, client, inverter_id):
+        channel = client.channel(f"inverter:{inverter_id}")
+        for table in self.tables:
+            channel.on_postgres_changes(
+                "*",
+                callback=lambda payload, table=table: self._on_change(inverter_id, table),
+                table=table,
+                schema=self.schema,
+                filter=f"inverter_id=eq.{inverter_id}",
+            )
+        await channel.subscribe(lambda state, error: self._kick())
+        return channel
+
+    async def _supervise(self):
+        self._changed = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        client = None
+        channels = {}
+        backoff = 1
+        while True:
+            if not self._is_open(client):
+                self._set_live(set())
+                channels = {}
+                if client is not None:
+                    try:
+                        await client.close()
+                    except Exception:
+                        pass
+                client = AsyncRealtimeClient(self.url, self.key, auto_reconnect=False, max_retries=1)
+                try:
+                    await client.connect()
+                    backoff = 1
+                except Exception as e:
+                    logger.warning("Realtime connection failed (%s), retrying in %ss", e, backoff)
+                    client = None
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, MAX_BACKOFF)
+                    continue
+
+            with self._lock:
+                wanted = set(self._wanted)
+            try:
+                for inverter_id in list(channels.keys() - wanted):
+                    await channels.pop(inverter_id).unsubscribe()
+                for inverter_id in wanted - channels.keys():
+                    channels[inverter_id] = await self._join(client, inverter_id)
+            except Exception as e:
+                logger.warning("Realtime channel update failed: %s", e)
+                await asyncio.sleep(self.check_interval)
+                continue
+            self._set_live({inv for inv, channel in channels.items() if channel.is_joined})
+
+            try:
+                await asyncio.wait_for(self._changed.wait(), self.check_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._changed.clear()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=asyncio.run, args=(self._supervise(),),
+                                                name="realtime-feed", daemon=True)
+                self._thread.start()
@@ -0,0 +1,45 @@
+import numpy as np
+
+# Samples kept per inverter: one hour at the 10 s poll interval (~43 KB for 15 columns).
+RING_CAPACITY = 360
+
+
+class TelemetryRing:
+    """
+    Fixed-capacity history of one inverter's telemetry, stored in preallocated NumPy
+    arrays (one row per sample, one column per telemetry column). Appending overwrites
+    the oldest row once full, so memory stays constant and no per-sample objects exist.
+
+    Not thread-safe on its own; the poller appends and copies under its lock.
+    """
+    __slots__ = ("columns", "capacity", "timestamps", "values", "_next", "_size")
+
+    def __init__(self, columns, capacity=RING_CAPACITY):
+        self.columns = list(columns)
+        self.capacity = capacity
+        self.timestamps = np.full(capacity, np.nan)
+        self.values = np.full((capacity, len(self.columns)), np.nan)
+        self._next = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, timestamp, row):
+        """
+        Store one sample (`row` in `columns` order). A sample with the timestamp of the
+        newest one is ignored, so re-fetching unchanged telemetry doesn't duplicate it.
+        """
+        if self._size and self.timestamps[self._next - 1] == timestamp:
+            return False
+        self.timestamps[self._next] = timestamp
+        self.values[self._next] = row
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        return True
+
+    def window(self, n=None):
+        """Copies of the last `n` (default: all) timestamps and rows, oldest first."""
+        n = self._size if n is None else min(n, self._size)
+        idx = np.arange(self._next - n, self._next) % self.capacity
+        return self.timestamps[idx], self.values[idx]
@@ -0,0 +1,113 @@
+import numpy as np
+
+# Universe of the normalized internal resistance Rn (same grid the skfuzzy version used).
+RN_UNIVERSE = np.arange(0, 15.1, 0.1)
+RN_MAX = 15.0
+
+# Rule outputs (zero-order Sugeno constants).
+OUT_HEALTHY = 1
+OUT_ACCEPTED = 0.7
+OUT_WEAK = 0.58
+OUT_BAD = 0
+
+
+def trimf(x, a, b, c):
+    """Triangular membership function, numerically identical to skfuzzy.trimf."""
+    y = np.zeros(len(x))
+    if a != b:
+        idx = np.nonzero(np.logical_and(a < x, x < b))[0]
+        y[idx] = (x[idx] - a) / float(b - a)
+    if b != c:
+        idx = np.nonzero(np.logical_and(b < x, x < c))[0]
+        y[idx] = (c - x[idx]) / float(c - b)
+    y[np.nonzero(x == b)] = 1
+    return y
+
+
+def trapmf(x, a, b, c, d):
+    """Trapezoidal membership function, numerically identical to skfuzzy.trapmf."""
+    y = np.ones(len(x))
+    idx = np.nonzero(x <= b)[0]
+    y[idx] = trimf(x[idx], a, b, b)
+    idx = np.nonzero(x >= c)[0]
+    y[idx] = trimf(x[idx], c, c, d)
+    y[np.nonzero(x < a)[0]] = 0
+    y[np.nonzero(x > d)[0]] = 0
+    return y
+
+
+class SugenoSOH:
+    """
+    Precompiled Sugeno fuzzy engine for the battery state of health (SOH).
+
+    The membership functions are sampled once on RN_UNIVERSE; `evaluate()` then scores
+    a whole array of Rn values with one `np.interp` per membership function.
+
+    Rules:
+      if Rn is vs then SOH = healthy (1)
+      if Rn is s  then SOH = accepted (0.7)
+      if Rn is m  then SOH = weak (0.58)
+      if Rn is l  then SOH = bad (0)
+
+    With `lut_step`, `evaluate_lut()` reads the output from a dense precomputed table
+    instead (faster, approximate; the worst error on the table is in `lut_max_error`).
+    """
+
+    def __init__(self, lut_step=None):
+        x = RN_UNIVERSE
+        self.universe = x
+        # "s": Triangular membership function with points [0.5, 3.5, 4]
+        self.mf_s = trimf(x, 0.5, 3.5, 4)
+        # "m": Triangular membership function with points [3, 6, 12]
+        self.mf_m = trimf(x, 3, 6, 12)
+        # "vs": Trapezoidal membership function with points [-4, -1.25, 1.25, 4]
+        self.mf_vs = trapmf(x, -4, -1.25, 1.25, 4)
+        # "l": Trapezoidal membership function with points [4, 10, 16.5, 28.5]
+        self.mf_l = trapmf(x, 4, 10, 16.5, 28.5)
+
+        self.lut_x = None
+        self.lut_y = None
+        self.lut_max_error = None
+        if lut_step:
+            self.lut_x = np.arange(0, RN_MAX + lut_step, lut_step)
+            self.lut_y, _ = self.evaluate(self.lut_x)
+            midpoints = (self.lut_x[:-1] + self.lut_x[1:]) / 2
+            exact, _ = self.evaluate(midpoints)
+            self.lut_max_error = float(np.nanmax(np.abs(self.evaluate_lut(midpoints) - exact)))
+
+    def degrees(self, rn):
+        """Membership degrees (s, m, vs, l) of every value in `rn`."""
+        rn = np.minimum(np.asarray(rn, dtype=float), RN_MAX)
+        x = self.universe
+        # Values outside the universe get a membership of zero (skfuzzy default).
+        return (np.interp(rn, x, self.mf_s, left=0.0, right=0.0),
+                np.interp(rn, x, self.mf_m, left=0.0, right=0.0),
+                np.interp(rn, x, self.mf_vs, left=0.0, right=0.0),
+                np.interp(rn, x, self.mf_l, left=0.0, right=0.0))
+
+    def evaluate(self, rn):
+        """
+        Score an array of Rn values.
+
+        Returns:
+          output: SOH in [0, 1] per value, NaN where no rule fires.
+          degrees: tuple of membership arrays (s, m, vs, l).
+        """
+        deg_s, deg_m, deg_vs, deg_l = self.degrees(rn)
+        # Same operation order as the original scalar code, so results match bit for bit.
+        numerator = deg_vs * OUT_HEALTHY + deg_s * OUT_ACCEPTED + deg_m * OUT_WEAK + deg_l * OUT_BAD
+        denominator = deg_vs + deg_s + deg_m + deg_l
+        with np.errstate(divide="ignore", invalid="ignore"):
+            output = np.where(denominator == 0, np.nan, numerator / denominator)
+        return output, (deg_s, deg_m, deg_vs, deg_l)
+
+    def evaluate_lut(self, rn):
+        """Approximate SOH of an array of Rn values from the dense lookup table."""
+        if self.lut_x is None:
+            raise ValueError("SugenoSOH was built without a lookup table (lut_step)")
+        rn = np.minimum(np.asarray(rn, dtype=float), RN_MAX)
+        return np.interp(rn, self.lut_x, self.lut_y, left=np.nan, right=np.nan)
+
+
+# Shared engine, built once at import (151-point universe, four membership functions).
+SOH_ENGINE = SugenoSOH()
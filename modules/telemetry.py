@@ -0,0 +1,48 @@
+import numpy as np
+
+
+def column_index(columns):
+    """{column: position} map shared by every vector over the same columns."""
+    return {column: i for i, column in enumerate(columns)}
+
+
+class TelemetryVector:
+    """
+    One telemetry row as a fixed float vector (one slot per selected column) plus the
+    few non-numeric fields the Overview shows. Built straight from the RPC JSON, so
+    the polling loop never creates a DataFrame.
+
+    `vector["battery_voltage"]` reads a column; `current - previous` is the delta as
+    another vector over the same columns.
+    """
+    __slots__ = ("index", "values", "updated_at", "online", "device_status")
+
+    def __init__(self, index, values, updated_at=None, online=None, device_status=None):
+        self.index = index
+        self.values = values
+        self.updated_at = updated_at
+        self.online = online
+        self.device_status = device_status
+
+    @classmethod
+    def from_row(cls, row, index):
+        """Build from one `fetch_data_for_user_inv` row (a dict); missing values are NaN."""
+        values = np.array([row.get(column) for column in index], dtype=float)
+        return cls(index, values, row.get("updated_at"), row.get("online"), row.get("device_status"))
+
+    def __getitem__(self, column):
+        return self.values[self.index[column]]
+
+    def __sub__(self, other):
+        return TelemetryVector(self.index, self.values - other.values,
+                               self.updated_at, self.online, self.device_status)
+
+    def zeros_like(self):
+        return TelemetryVector(self.index, np.zeros_like(self.values),
+                               self.updated_at, self.online, self.device_status)
+
+    def same_as(self, other):
+        """True if both rows carry the same data."""
+        return (self.updated_at == other.updated_at and self.online == other.online
+                and self.device_status == other.device_status
+                and np.array_equal(self.values, other.values, equal_nan=True))
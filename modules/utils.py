@@ -1,18 +1,15 @@
 import re
-import bcrypt
 import hashlib
 import base64
 import streamlit as st
-from protonmail import ProtonMail
 import secrets
 import string
-import streamlit as st
-import pandas as pd
 import random
-import skfuzzy as fuzz
-import numpy as np
-import plotly.graph_objects as go
 from datetime import timedelta
+from modules.alarms import AlarmMask
+from modules.query_metrics import timed_execute
+# Heavy dependencies (pandas, numpy, plotly, bcrypt, protonmail) are imported inside the
+# functions that use them, so the landing pages don't pay for them at startup.
 
 def str_to_flags(input_str, flags_list):
     """
@@ -54,12 +51,11 @@ def str_to_flags(input_str, flags_list):
             ...
         ]
     """
-    # Convert the hex string (e.g., \\x12) to an integer (e.g., 18)
-    byte_value = int.from_bytes(bytes.fromhex(input_str[2:]), byteorder='big')
+    mask = AlarmMask.from_hex(input_str)
 
-    # Map each bit of the byte to the "Triggered" state of the corresponding flag
+    # Map each bit of the mask to the "Triggered" state of the corresponding flag
     for i, flag in enumerate(flags_list):
-        flag["Triggered"] = bool((byte_value >> i) & 1)
+        flag["Triggered"] = i in mask
 
     return flags_list
 
@@ -94,42 +90,74 @@ def flags_to_str(flags_list):
     Output:
         "\\x12"  # 00010010 in binary, 0x12 in hex
     """
-    # Initialize a byte value to store the binary state of flags
-    byte_value = 0
-
-    # Traverse each flag and set the corresponding bit in the byte if "Triggered" is True
-    for i, flag in enumerate(flags_list):
-        if flag["Triggered"]:
-            byte_value |= (1 << i)
+    # One bit per flag; lists of more than 8 flags get as many bytes as they need.
+    return AlarmMask.from_flags(flag["Triggered"] for flag in flags_list).to_hex(len(flags_list))
 
-    # Convert the byte to a hexadecimal string in \\xNN format
-    return "\\x" + byte_value.to_bytes(1, byteorder='big').hex()
+# Table behind the fetch_data_for_user_inv RPC (one telemetry row per inverter).
+TELEMETRY_TABLE = "inverter_data"
 
 def get_from_alarms(supabase, inverter_id, table):
-    return supabase.table(table).select("triggers").eq("inverter_id", inverter_id).execute()
+    return timed_execute(f"{table}.select", supabase.table(table).select("triggers").eq("inverter_id", inverter_id))
     
 
 def get_from_database(supabase, user_id, inverter_id):
-    response = supabase.rpc('fetch_data_for_user_inv', {'uid': user_id, 'inv_id': inverter_id}).execute()
+    import pandas as pd
+
+    response = timed_execute("rpc.fetch_data_for_user_inv",
+                             supabase.rpc('fetch_data_for_user_inv', {'uid': user_id, 'inv_id': inverter_id}))
     data = response.data
     if data:
         df = pd.DataFrame(data)
         return df
 
-def send_one_time_backup_code(proton_username, proton_password, recipient_email, code_length=8):
+def fetch_inverter_snapshot(supabase, user_id, inverter_id):
+    """
+    Fetch all live state of one inverter in a single round trip, using the
+    `fetch_inverter_snapshot` function (see sql/fetch_inverter_snapshot.sql).
+
+    Returns:
+      The RPC JSON as a dict with:
+        telemetry: list of fetch_data_for_user_inv rows (None if there is no data)
+        critical_alarms, maintenance_warnings: {"triggers", "updated_at"} rows (or None)
+        soh: {"Rn", "statistics_ready", "statistics_ready_date", "Cday_copy", "Pday_copy"} (or None)
+    """
+    response = timed_execute("rpc.fetch_inverter_snapshot",
+                             supabase.rpc('fetch_inverter_snapshot', {'uid': user_id, 'inv_id': inverter_id}))
+    return response.data or {}
+
+def get_inverter_snapshot(supabase, user_id, inverter_id):
+    """
+    Same as `fetch_inverter_snapshot`, with the telemetry as a DataFrame.
+
+    Returns:
+      A dict with:
+        telemetry: DataFrame of fetch_data_for_user_inv rows (None if there is no data)
+        critical_alarms, maintenance_warnings, soh: as in `fetch_inverter_snapshot`
+    """
+    import pandas as pd
+
+    data = fetch_inverter_snapshot(supabase, user_id, inverter_id)
+    return {
+        "telemetry": pd.DataFrame(data["telemetry"]) if data.get("telemetry") else None,
+        "critical_alarms": data.get("critical_alarms"),
+        "maintenance_warnings": data.get("maintenance_warnings"),
+        "soh": data.get("soh"),
+    }
+
+def send_one_time_backup_code(recipient_email, code_length=8):
     """
-    Generates a one-time backup code, creates a styled HTML email, logs into ProtonMail,
-    and sends the code via email.
+    Generates a one-time backup code, creates a styled HTML email and queues it on the
+    shared outbox (see modules/outbox.py), which sends it in the background.
     
     Parameters:
-      proton_username (str): Your ProtonMail email address.
-      proton_password (str): Your ProtonMail password.
       recipient_email (str): The email address where the backup code will be sent.
       code_length (int): Length of the backup code (default is 8).
     
     Returns:
       str: The generated backup code.
     """
+    from modules.outbox import get_outbox
+
     # Generate backup code using a secure random selection from uppercase letters and digits
     pool = string.ascii_uppercase + string.digits
     backup_code = ''.join(secrets.choice(pool) for _ in range(code_length))
@@ -191,21 +219,9 @@ def send_one_time_backup_code(proton_username, proton_password, recipient_email,
     </html>
     """
     
-    # Log in to ProtonMail
-    proton = ProtonMail()
-    proton.login(proton_username, proton_password)
+    # Hand the email to the outbox; the worker reuses one logged-in mail session.
+    get_outbox().enqueue(recipient_email, "Your One-Time Backup Code", html)
     
-    # Create the message with HTML content
-    message = proton.create_message(
-        recipients=[recipient_email],
-        subject="Your One-Time Backup Code",
-        body=html  # HTML formatted email body
-    )
-    
-    # Send the message via ProtonMail
-    sent_message = proton.send_message(message)
-    
-    # Optionally, you can check sent_message for confirmation details.
     return backup_code
 
 def reset_error_flags():
@@ -248,17 +264,15 @@ def generate_error_message(flags):
 
 def hash_value(value: str) -> str:
     """
-    Hash a given value (e.g., password or PIN code) using bcrypt.
+    Hash a given value (e.g., password or PIN code) using bcrypt, on the shared
+    hashing pool (see modules/hashing.py).
     
     Returns:
         The hashed value as a UTF-8 decoded string.
     """
-    # Convert the value to bytes.
-    value_bytes = value.encode('utf-8')
-    # Generate salt and compute hash.
-    hashed = bcrypt.hashpw(value_bytes, bcrypt.gensalt())
-    # Return hashed value as a string.
-    return hashed.decode('utf-8')
+    from modules.hashing import get_hasher
+
+    return get_hasher().hash(value)
 
 def verify_value(plain_value: str, hashed_value: str) -> bool:
     """
@@ -271,7 +285,18 @@ def verify_value(plain_value: str, hashed_value: str) -> bool:
     Returns:
         True if they match; otherwise, False.
     """
-    return bcrypt.checkpw(plain_value.encode('utf-8'), hashed_value.encode('utf-8'))
+    from modules.hashing import get_hasher
+
+    return get_hasher().verify(plain_value, hashed_value)
+
+def needs_rehash(hashed_value: str) -> bool:
+    """
+    Check whether a stored hash was made with a different bcrypt work factor than the
+    configured one, in which case it should be replaced after a successful login.
+    """
+    from modules.hashing import get_hasher
+
+    return get_hasher().needs_rehash(hashed_value)
 
 def hash_to_complex_string(input_string, length=12):
     """
@@ -366,7 +391,8 @@ def update_to_database(supabase, inverter_id, update_values):
     table_name = "commands_state"  # Replace with your table name
     record_id = inverter_id  # Replace with the ID of the record you want to update
     # Update the record
-    response = supabase.table(table_name).update(update_values).eq('inverter_id', record_id).execute()
+    response = timed_execute("commands_state.update",
+                             supabase.table(table_name).update(update_values).eq('inverter_id', record_id))
 def make_int_3inices(num):
     if num < 100:
         strn = "0"+str(num)
@@ -383,7 +409,8 @@ def make_int_2inices(num):
 def upsert_to_database(supabase, inverter_id, update_values):
     #update_values['inverter_id'] = inverter_id
     # Update the record
-    response = supabase.table("commands_state").upsert(update_values, on_conflict=["inverter_id"]).execute()
+    response = timed_execute("commands_state.upsert",
+                             supabase.table("commands_state").upsert(update_values, on_conflict=["inverter_id"]))
 def generate_random_key(length=8):
     """Generate a random key composed of lowercase letters and digits."""
     return ''.join(random.choices(string.ascii_lowercase + string.digits, k=length))
@@ -392,75 +419,41 @@ def generate_random_key(length=8):
 # Define the fuzzy inference function
 # ----------------------------
 def sugeno_inference(Rn_value):
-    # ----------------------------
-    # Define the universe for the input variable Rn
-    # ----------------------------
-    x_Rn = np.arange(0, 15.1, 0.1)
-
-    # ----------------------------
-    # Define membership functions for Rn
-    # ----------------------------
-    # "s": Triangular membership function with points [0.5, 3.5, 4]
-    mf_s = fuzz.trimf(x_Rn, [0.5, 3.5, 4])
-    # "m": Triangular membership function with points [3, 6, 12]
-    mf_m = fuzz.trimf(x_Rn, [3, 6, 12])
-    # "vs": Trapezoidal membership function with points [-4, -1.25, 1.25, 4]
-    mf_vs = fuzz.trapmf(x_Rn, [-4, -1.25, 1.25, 4])
-    # "l": Trapezoidal membership function with points [4, 10, 16.5, 28.5]
-    mf_l = fuzz.trapmf(x_Rn, [4, 10, 16.5, 28.5])
-    out_bad = 0
-    out_weak = 0.58
-    out_accepted = 0.7
-    out_healthy = 1
-
-    if Rn_value > 15.0:
-        Rn_value = 15.0
-    # Calculate membership degrees for the input value
-    # get the membership degrees for a given input value
-    deg_s = fuzz.interp_membership(x_Rn, mf_s, Rn_value)
-    deg_m = fuzz.interp_membership(x_Rn, mf_m, Rn_value)
-    deg_vs = fuzz.interp_membership(x_Rn, mf_vs, Rn_value)
-    deg_l = fuzz.interp_membership(x_Rn, mf_l, Rn_value)
-
-    # Define the rule outputs and their firing strengths.
-    # Each rule fires with a strength equal to the membership degree of its antecedent.
-    # Rule 1: if Rn is vs then SOH = healthy (1)
-    w1 = deg_vs
-    # Rule 2: if Rn is s then SOH = accepted (0.7)
-    w2 = deg_s
-    # Rule 3: if Rn is m then SOH = weak (0.58)
-    w3 = deg_m
-    # Rule 4: if Rn is l then SOH = bad (0)
-    w4 = deg_l
-
-    # Calculate weighted average (Sugeno defuzzification):
-    numerator = w1 * out_healthy + w2 * out_accepted + w3 * out_weak + w4 * out_bad
-    denominator = w1 + w2 + w3 + w4
+    """
+    State of health (SOH) of one battery from its normalized resistance Rn.
 
+    Uses the precompiled engine in modules.soh (membership functions are built once);
+    use `SOH_ENGINE.evaluate(array)` to score many batteries in a single call.
+
+    Returns:
+      (output, (deg_s, deg_m, deg_vs, deg_l)); output is None if no rule fires.
+    """
+    import numpy as np
+    from modules.soh import SOH_ENGINE
+
+    outputs, degrees = SOH_ENGINE.evaluate(np.array([Rn_value], dtype=float))
+    deg_s, deg_m, deg_vs, deg_l = (d[0] for d in degrees)
     # Avoid division by zero; if no rule fires, return None or some default value.
-    if denominator == 0:
+    if np.isnan(outputs[0]) and deg_s + deg_m + deg_vs + deg_l == 0:
         return None, (deg_s, deg_m, deg_vs, deg_l)
-
-    output = numerator / denominator
-    return output, (deg_s, deg_m, deg_vs, deg_l)
+    return outputs[0], (deg_s, deg_m, deg_vs, deg_l)
 
 def count_ones_in_hex(hex_string):
     try:
-        # Convert the hexadecimal part of the string to an integer
-        hex_value = int(hex_string[2:], 16)
-        # Convert the integer to binary and count the number of ones
-        ones_count = bin(hex_value).count('1')
-        return ones_count
+        # Same parsing as ever (everything after the two-character prefix as hex), counted
+        # without building the binary string.
+        return int(hex_string[2:], 16).bit_count()
     except ValueError:
         return "Invalid input! Please provide a string in the format '\\xNN'."
 
 
 # Create a simple Plotly graph
-def create_plotly_chart_power(dayes, power, date):
-    # Sample data
+def create_plotly_chart_power(dayes, power, date, max_points=None):
+    import plotly.graph_objects as go
+    from modules.downsample import downsample, MAX_CHART_POINTS
 
-    x = dayes
-    y = power
+    # Bound the points sent to the browser (MAX_CHART_POINTS unless given); peaks are kept.
+    x, y = downsample(dayes, power, max_points or MAX_CHART_POINTS)
 
     # Create a Plotly figure
     fig = go.Figure()
@@ -486,11 +479,12 @@ def create_plotly_chart_power(dayes, power, date):
     return fig
 
 # Create a simple Plotly graph
-def create_plotly_chart_dcc(dayes, power, date):
-    # Sample data
+def create_plotly_chart_dcc(dayes, power, date, max_points=None):
+    import plotly.graph_objects as go
+    from modules.downsample import downsample, MAX_CHART_POINTS
 
-    x = dayes
-    y = power
+    # Bound the points sent to the browser (MAX_CHART_POINTS unless given); peaks are kept.
+    x, y = downsample(dayes, power, max_points or MAX_CHART_POINTS)
 
     # Create a Plotly figure
     fig = go.Figure()
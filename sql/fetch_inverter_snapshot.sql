@@ -0,0 +1,46 @@
+-- All live state of one inverter in a single round trip.
+--
+-- Returns one JSON object:
+--   telemetry             rows of fetch_data_for_user_inv(uid, inv_id)
+--   critical_alarms       {triggers, updated_at}
+--   maintenance_warnings  {triggers, updated_at}
+--   soh                   {Rn, statistics_ready, statistics_ready_date, Cday_copy, Pday_copy}
+--
+-- Alarm and SOH rows are only returned for inverters linked to `uid`.
+-- Keep the parameter types in sync with fetch_data_for_user_inv.
+create or replace function fetch_inverter_snapshot(uid bigint, inv_id text)
+returns json
+language sql
+stable
+as $$
+  with owned as (
+    select 1
+    from company_inverters
+    where inverter_id = inv_id and user_id = uid
+  )
+  select json_build_object(
+    'telemetry', (
+      select coalesce(json_agg(t), '[]'::json)
+      from fetch_data_for_user_inv(uid, inv_id) t
+    ),
+    'critical_alarms', (
+      select row_to_json(a)
+      from (select triggers, updated_at from critical_alarms where inverter_id = inv_id) a
+      where exists (select 1 from owned)
+    ),
+    'maintenance_warnings', (
+      select row_to_json(m)
+      from (select triggers, updated_at from maintenance_warnings where inverter_id = inv_id) m
+      where exists (select 1 from owned)
+    ),
+    'soh', (
+      select row_to_json(s)
+      from (
+        select "Rn", statistics_ready, statistics_ready_date, "Cday_copy", "Pday_copy"
+        from "SOH"
+        where inverter_id = inv_id
+      ) s
+      where exists (select 1 from owned)
+    )
+  );
+$$;
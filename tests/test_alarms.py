@@ -0,0 +1,110 @@
+import pytest
+
+from modules.alarms import CRITICAL_ALARMS, MAINTENANCE_WARNINGS, AlarmMask, count_triggers, decode_triggers
+from modules.utils import flags_to_str, str_to_flags
+
+
+# The conversions as they were before AlarmMask, kept here as the reference.
+def baseline_str_to_flags(input_str, flags_list):
+    byte_value = int.from_bytes(bytes.fromhex(input_str[2:]), byteorder='big')
+    for i, flag in enumerate(flags_list):
+        flag["Triggered"] = bool((byte_value >> i) & 1)
+    return flags_list
+
+
+def baseline_flags_to_str(flags_list):
+    byte_value = 0
+    for i, flag in enumerate(flags_list):
+        if flag["Triggered"]:
+            byte_value |= (1 << i)
+    return "\\x" + byte_value.to_bytes(1, byteorder='big').hex()
+
+
+def flags(width, triggered=()):
+    return [{"Flag": f"Flag{i}", "Triggered": i in triggered} for i in range(width)]
+
+
+def triggered(flags_list):
+    return [flag["Triggered"] for flag in flags_list]
+
+
+HEX_CASES = [
+    "\\x00",
+    "\\x01",
+    "\\x12",
+    "\\x80",
+    "\\xff",
+    "\\x0102",       # multi-byte, big-endian
+    "\\xff00",
+    "\\x00ff",
+    "\\x010000",
+    "\\x",           # empty bytea
+    "",
+]
+WIDTHS = [1, 4, 8, 9, 16, 20]
+
+
+@pytest.mark.parametrize("width", WIDTHS)
+@pytest.mark.parametrize("hex_string", HEX_CASES)
+def test_str_to_flags_matches_baseline(hex_string, width):
+    assert triggered(str_to_flags(hex_string, flags(width))) == \
+        triggered(baseline_str_to_flags(hex_string, flags(width)))
+
+
+@pytest.mark.parametrize("width", WIDTHS)
+@pytest.mark.parametrize("hex_string", HEX_CASES)
+def test_decode_and_count_match_baseline(hex_string, width):
+    expected = triggered(baseline_str_to_flags(hex_string, flags(width)))
+    assert decode_triggers([hex_string], width)[0].tolist() == expected
+    assert count_triggers([hex_string], width).tolist() == [sum(expected)]
+
+
+@pytest.mark.parametrize("hex_string", HEX_CASES)
+def test_from_hex_matches_baseline(hex_string):
+    expected = triggered(baseline_str_to_flags(hex_string, flags(24)))
+    mask = AlarmMask.from_hex(hex_string)
+    assert [i in mask for i in range(24)] == expected
+    assert len(mask) == sum(expected)
+    assert list(mask) == [i for i, on in enumerate(expected) if on]
+
+
+@pytest.mark.parametrize("hex_string", ["\\x1", "\\x123", "\\xzz"])
+def test_odd_length_and_non_hex_input_raise_like_baseline(hex_string):
+    with pytest.raises(ValueError):
+        baseline_str_to_flags(hex_string, flags(8))
+    with pytest.raises(ValueError):
+        AlarmMask.from_hex(hex_string)
+    with pytest.raises(ValueError):
+        decode_triggers([hex_string], 8)
+
+
+def test_missing_triggers_decode_as_no_flags():
+    assert AlarmMask.from_hex(None) == AlarmMask(0)
+    assert decode_triggers([None, "\\x05"], 4).tolist() == [[False] * 4, [True, False, True, False]]
+    assert decode_triggers([], 8).shape == (0, 8)
+
+
+@pytest.mark.parametrize("width", range(1, 9))
+@pytest.mark.parametrize("on", [(), (0,), (1, 4), (0, 2, 3), (7,), tuple(range(8))])
+def test_flags_to_str_matches_baseline(width, on):
+    flags_list = flags(width, on)
+    assert flags_to_str(flags_list) == baseline_flags_to_str(flags_list)
+    assert AlarmMask.from_flags(triggered(flags_list)).to_hex(width) == baseline_flags_to_str(flags_list)
+
+
+def test_more_than_eight_flags_get_more_bytes():
+    flags_list = flags(12, (1, 9))
+    # The baseline only ever wrote one byte.
+    with pytest.raises(OverflowError):
+        baseline_flags_to_str(flags_list)
+    assert flags_to_str(flags_list) == "\\x0202"
+    assert triggered(str_to_flags(flags_to_str(flags_list), flags(12))) == triggered(flags_list)
+
+
+@pytest.mark.parametrize("catalog", [CRITICAL_ALARMS, MAINTENANCE_WARNINGS], ids=["critical", "maintenance"])
+def test_catalog_round_trip(catalog):
+    for value in range(1 << len(catalog)):
+        hex_string = AlarmMask(value).to_hex(len(catalog))
+        assert hex_string == baseline_flags_to_str(baseline_str_to_flags(hex_string, flags(len(catalog))))
+        assert catalog.triggered(hex_string)["Flag"].tolist() == \
+            [catalog.flags[i] for i in range(len(catalog)) if (value >> i) & 1]
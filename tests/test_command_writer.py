@@ -0,0 +1,132 @@
+import time
+
+import pytest
+
+from modules.command_writer import CHANGE_FLAG, CommandWriteError, CommandWriter, diff_command
+
+STORED = {"inverter_id": "inv001", "u_max_cc": "040", "s_max_cc": "050", "ac_lv_th": 176, CHANGE_FLAG: False}
+
+
+class StubResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class StubQuery:
+    def __init__(self, client, operation, values):
+        self._client, self._operation, self._values = client, operation, values
+
+    def eq(self, column, value):
+        return self
+
+    def execute(self):
+        self._client.writes.append((self._operation, dict(self._values)))
+        if self._client.fail:
+            raise RuntimeError("backend down")
+        self._client.row.update(self._values)
+        return StubResponse([dict(self._client.row)])
+
+
+class StubClient:
+    """Just enough of the Supabase client for commands_state writes."""
+
+    def __init__(self, row=None, fail=False, broken=False):
+        self.row = dict(row if row is not None else STORED)
+        self.fail = fail
+        self.broken = broken
+        self.writes = []
+
+    def table(self, name):
+        if self.broken:
+            raise RuntimeError("no client")
+        return self
+
+    def update(self, values):
+        return StubQuery(self, "update", values)
+
+    def upsert(self, values, on_conflict=None):
+        return StubQuery(self, "upsert", values)
+
+
+def writer(client, debounce=0.05):
+    return CommandWriter(client, debounce=debounce, write_timeout=2)
+
+
+def test_diff_command_compares_numbers_and_skips_the_change_flag():
+    assert diff_command(STORED, {"u_max_cc": "040", "ac_lv_th": 176.0, CHANGE_FLAG: True}) == {}
+    assert diff_command(STORED, {"u_max_cc": "060", "s_max_cc": "050"}) == {"u_max_cc": "060"}
+    assert diff_command(STORED, {"battery_cv": "28.8"}) == {"battery_cv": "28.8"}
+    assert diff_command(None, {"u_max_cc": "040", CHANGE_FLAG: True}) == {"u_max_cc": "040"}
+
+
+def test_nothing_changed_resolves_without_a_write():
+    client = StubClient()
+    assert writer(client).submit("inv001", STORED, {"u_max_cc": "040"}, "a").wait(1) is None
+    assert client.writes == []
+
+
+def test_quick_submissions_are_coalesced_into_one_write():
+    client = StubClient()
+    w = writer(client)
+    first = w.submit("inv001", STORED, {"u_max_cc": "060", "s_max_cc": "050"}, "a")
+    second = w.submit("inv001", STORED, {"u_max_cc": "060", "s_max_cc": "070"}, "a")
+    assert first.wait(1)["s_max_cc"] == second.wait(1)["s_max_cc"] == "070"
+    assert client.writes == [("update", {"u_max_cc": "060", "s_max_cc": "070", CHANGE_FLAG: True})]
+
+
+def test_owner_can_set_its_own_column_back():
+    client = StubClient()
+    w = writer(client)
+    first = w.submit("inv001", STORED, {"u_max_cc": "060", "s_max_cc": "050"}, "a")
+    second = w.submit("inv001", STORED, {"u_max_cc": "040", "s_max_cc": "070"}, "a")
+    assert second.wait(1)["u_max_cc"] == "040"
+    assert first.wait(1)["s_max_cc"] == "070"
+    assert client.writes == [("update", {"s_max_cc": "070", CHANGE_FLAG: True})]
+
+
+def test_stale_form_of_another_session_keeps_the_first_change():
+    client = StubClient()
+    w = writer(client)
+    first = w.submit("inv001", STORED, {"u_max_cc": "060", "s_max_cc": "050"}, "a")
+    # Session b still shows the stored u_max_cc and only changes s_max_cc.
+    second = w.submit("inv001", STORED, {"u_max_cc": "040", "s_max_cc": "070"}, "b")
+    assert first.wait(1)["u_max_cc"] == "060"
+    assert second.wait(1)["s_max_cc"] == "070"
+    assert client.writes == [("update", {"u_max_cc": "060", "s_max_cc": "070", CHANGE_FLAG: True})]
+
+
+def test_overridden_submission_is_told_so():
+    client = StubClient()
+    w = writer(client)
+    first = w.submit("inv001", STORED, {"u_max_cc": "060"}, "a")
+    second = w.submit("inv001", STORED, {"u_max_cc": "070"}, "b")
+    assert second.wait(1)["u_max_cc"] == "070"
+    with pytest.raises(CommandWriteError, match="same settings"):
+        first.wait(1)
+
+
+def test_first_settings_of_an_inverter_are_upserted():
+    client = StubClient(row={})
+    pending = writer(client).submit("inv002", None, {"u_max_cc": "060"}, "a")
+    assert pending.wait(1)["inverter_id"] == "inv002"
+    assert client.writes == [("upsert", {"u_max_cc": "060", CHANGE_FLAG: True, "inverter_id": "inv002"})]
+
+
+@pytest.mark.parametrize("client", [StubClient(fail=True), StubClient(broken=True)], ids=["execute", "table"])
+def test_failed_write_reaches_every_submitter(client):
+    w = writer(client)
+    waiters = [w.submit("inv001", STORED, {"u_max_cc": "060"}, "a"),
+               w.submit("inv001", STORED, {"s_max_cc": "070"}, "b")]
+    for pending in waiters:
+        with pytest.raises(CommandWriteError, match="could not be saved"):
+            pending.wait(1)
+
+
+def test_unconfirmed_write_times_out():
+    client = StubClient()
+    w = writer(client, debounce=0.5)
+    with pytest.raises(CommandWriteError, match="not confirmed in time"):
+        w.submit("inv001", STORED, {"u_max_cc": "060"}, "a").wait(0.01)
+    # The write still lands once the debounce is over.
+    time.sleep(0.7)
+    assert client.row["u_max_cc"] == "060"
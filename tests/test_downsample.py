@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from modules.downsample import downsample
+
+
+@pytest.mark.parametrize("method", ["minmax", "lttb"])
+@pytest.mark.parametrize("max_points", [4, 5, 7, 10, 33, 100])
+def test_never_more_than_max_points(method, max_points):
+    y = np.sin(np.arange(1000) / 7.0)
+    x, y_out = downsample(list(range(1000)), y, max_points, method)
+    assert len(x) == len(y_out) <= max_points
+    assert x[0] == 0 and x[-1] == 999
+
+
+def test_minmax_keeps_a_spike():
+    y = np.zeros(5000)
+    y[1234] = 50.0
+    x, y_out = downsample(np.arange(5000), y, 10)
+    assert 1234 in x
+
+
+@pytest.mark.parametrize("max_points", [0, 1, 3])
+def test_too_few_points_is_rejected(max_points):
+    with pytest.raises(ValueError):
+        downsample(list(range(100)), list(range(100)), max_points)